@@ -35,6 +35,11 @@
         "/var/log:/logs:ro"
         "/etc/localtime:/etc/localtime:ro"
       ];
+      environment = {
+        # "pull" computes metrics when Prometheus scrapes, cached for BUSINESS_METRICS_TTL seconds
+        BUSINESS_METRICS_MODE = "push";
+        BUSINESS_METRICS_TTL = "300";
+      };
       cmd = [ "sh" "-c" "cd /app && pip install prometheus_client requests && python business_metrics.py" ];
     };
   };
@@ -73,7 +78,8 @@ import sqlite3
 import subprocess
 from pathlib import Path
 from datetime import datetime, timedelta
-from prometheus_client import start_http_server, Gauge, Counter, Histogram, Info
+import threading
+from prometheus_client import start_http_server, Gauge, Counter, Histogram, Info, CollectorRegistry, REGISTRY
 import logging
 
 # Configure logging
@@ -95,44 +101,161 @@ user_activity = Counter('user_activity_total', 'User activity counter', ['action
 storage_cost_estimate = Gauge('storage_cost_estimate_monthly', 'Estimated monthly storage cost', ['tier'])
 processing_cost_estimate = Gauge('processing_cost_estimate_monthly', 'Estimated monthly processing cost', ['type'])
 
+class ScrapeCollector:
+    """Custom collector that keeps the business cycle fresh for /metrics scrapes.
+
+    Every collector here walks the filesystem, which takes longer than a scrape
+    may, so scrapes only ever serve the last values. Once they are older than ttl
+    seconds a single background cycle is started to refresh them.
+    """
+
+    def __init__(self, monitor, ttl, source_registry=REGISTRY):
+        self.monitor = monitor
+        self.ttl = ttl
+        self.source_registry = source_registry
+        self.refreshed = float('-inf')
+        self.refreshing = False
+        self.lock = threading.Lock()
+
+    def _refresh(self, started):
+        try:
+            self.monitor.run_monitoring_cycle()
+            self.refreshed = started
+        except Exception as e:
+            logger.error(f"Error in business monitoring cycle: {e}")
+        finally:
+            self.refreshing = False
+
+    def collect(self):
+        # Serialise concurrent scrapes so an expired cache is only refreshed once
+        with self.lock:
+            now = time.monotonic()
+            if not self.refreshing and now - self.refreshed >= self.ttl:
+                self.refreshing = True
+                threading.Thread(target=self._refresh, args=(now,), name='business-cycle', daemon=True).start()
+        yield from self.source_registry.collect()
+
+class ScanStats:
+    """Aggregated totals for one directory tree"""
+
+    def __init__(self):
+        self.entries = 0
+        self.files = 0
+        self.bytes = 0
+        self.recent_files = 0
+        self.recent_bytes = 0
+
+class LibraryScan:
+    """Single os.scandir pass over every tree the business collectors read.
+
+    Totals are kept per root and per first-level child of each root, so e.g.
+    /hot/downloads/movies can be read without a second walk. "Recent" means
+    modified within recent_window seconds of the scan starting.
+    """
+
+    def __init__(self, roots, recent_window=86400):
+        self.roots = roots
+        self.recent_window = recent_window
+        self.started = 0.0
+        self.trees = {}
+        self.children = {}
+
+    def run(self):
+        """Walk every root once and return self"""
+        self.started = time.time()
+        recent_cutoff = self.started - self.recent_window
+
+        for root in self.roots:
+            if not os.path.isdir(root):
+                continue
+            tree = self.trees[root] = ScanStats()
+            children = self.children[root] = {}
+
+            # Each stack item carries the first-level child it belongs to (None at the root)
+            stack = [(root, None)]
+            while stack:
+                directory, child = stack.pop()
+                try:
+                    with os.scandir(directory) as entries:
+                        for entry in entries:
+                            if child is None:
+                                owner = children.setdefault(entry.name, ScanStats())
+                            else:
+                                owner = child
+                            tree.entries += 1
+                            owner.entries += 1
+                            try:
+                                if entry.is_dir(follow_symlinks=False):
+                                    stack.append((entry.path, owner))
+                                    continue
+                                if not entry.is_file():
+                                    continue
+                                # DirEntry caches this, so each file is stat'ed exactly once
+                                st = entry.stat()
+                            except OSError:
+                                continue
+                            for stats in (tree, owner):
+                                stats.files += 1
+                                stats.bytes += st.st_size
+                                if st.st_mtime > recent_cutoff:
+                                    stats.recent_files += 1
+                                    stats.recent_bytes += st.st_size
+                except OSError:
+                    continue
+
+        return self
+
+    def tree(self, path):
+        """Totals for a scanned root, or None if it wasn't there"""
+        return self.trees.get(path)
+
+    def child(self, root, name):
+        """Totals for a first-level child of a scanned root, or None"""
+        return self.children.get(root, {}).get(name)
+
 class BusinessMonitor:
     def __init__(self):
+        # Mount points inside the container; overridable for benchmarks
+        media_root = os.getenv('MONITOR_MEDIA_ROOT', '/media')
+        hot_root = os.getenv('MONITOR_HOT_ROOT', '/hot')
+        
         self.media_paths = {
-            'movies': '/media/movies',
-            'tv': '/media/tv', 
-            'music': '/media/music'
+            'movies': f'{media_root}/movies',
+            'tv': f'{media_root}/tv', 
+            'music': f'{media_root}/music'
         }
         
         self.hot_paths = {
-            'downloads': '/hot/downloads',
-            'cache': '/hot/cache',
-            'processing': '/hot/processing'
+            'downloads': f'{hot_root}/downloads',
+            'cache': f'{hot_root}/cache',
+            'processing': f'{hot_root}/processing'
         }
         
+        self.manual_path = f'{hot_root}/manual'
+        
+        # Shared scan for the current cycle; every collector reads from it
+        self.scan = None
+        
+    def refresh_scan(self):
+        """Walk the media and hot trees once for all collectors"""
+        roots = list(self.media_paths.values()) + list(self.hot_paths.values()) + [self.manual_path]
+        self.scan = LibraryScan(roots).run()
+        logger.info(f"Library scan finished in {time.time() - self.scan.started:.1f}s")
+        return self.scan
+        
     def calculate_library_metrics(self):
         """Calculate media library metrics"""
         try:
+            scan = self.scan or self.refresh_scan()
             for media_type, path in self.media_paths.items():
-                if not os.path.exists(path):
+                tree = scan.tree(path)
+                if tree is None:
                     continue
                     
-                total_size = 0
-                total_files = 0
+                media_library_size.labels(type=media_type).set(tree.bytes)
+                media_library_count.labels(type=media_type).set(tree.files)
                 
-                for root, dirs, files in os.walk(path):
-                    for file in files:
-                        file_path = os.path.join(root, file)
-                        try:
-                            file_size = os.path.getsize(file_path)
-                            total_size += file_size
-                            total_files += 1
-                        except OSError:
-                            continue
-                            
-                media_library_size.labels(type=media_type).set(total_size)
-                media_library_count.labels(type=media_type).set(total_files)
-                
-                logger.info(f"{media_type}: {total_files} files, {total_size / (1024**3):.2f} GB")
+                logger.info(f"{media_type}: {tree.files} files, {tree.bytes / (1024**3):.2f} GB")
                 
         except Exception as e:
             logger.error(f"Error calculating library metrics: {e}")
@@ -140,25 +263,13 @@ class BusinessMonitor:
     def calculate_storage_efficiency(self):
         """Calculate storage efficiency metrics"""
         try:
-            # Hot storage efficiency (how much is actively being used)
-            hot_total = 0
-            hot_active = 0
+            scan = self.scan or self.refresh_scan()
             
-            for tier, path in self.hot_paths.items():
-                if os.path.exists(path):
-                    for root, dirs, files in os.walk(path):
-                        for file in files:
-                            file_path = os.path.join(root, file)
-                            try:
-                                file_size = os.path.getsize(file_path)
-                                hot_total += file_size
-                                
-                                # Files modified in last 24 hours are considered "active"
-                                mod_time = os.path.getmtime(file_path)
-                                if time.time() - mod_time < 86400:  # 24 hours
-                                    hot_active += file_size
-                            except OSError:
-                                continue
+            # Hot storage efficiency (how much is actively being used)
+            # Files modified in last 24 hours are considered "active"
+            hot_trees = [scan.tree(path) for path in self.hot_paths.values()]
+            hot_total = sum(tree.bytes for tree in hot_trees if tree)
+            hot_active = sum(tree.recent_bytes for tree in hot_trees if tree)
                                 
             if hot_total > 0:
                 efficiency = hot_active / hot_total
@@ -174,25 +285,19 @@ class BusinessMonitor:
     def estimate_costs(self):
         """Estimate infrastructure costs"""
         try:
+            scan = self.scan or self.refresh_scan()
+            
             # Storage cost estimates ($/GB/month)
             hot_storage_cost_per_gb = 0.10  # SSD
             cold_storage_cost_per_gb = 0.02  # HDD
             
             # Calculate hot storage cost
-            hot_size_gb = sum(
-                sum(os.path.getsize(os.path.join(root, file)) 
-                    for root, _, files in os.walk(path) 
-                    for file in files if os.path.exists(os.path.join(root, file))
-                ) for path in self.hot_paths.values() if os.path.exists(path)
-            ) / (1024**3)
+            hot_trees = [scan.tree(path) for path in self.hot_paths.values()]
+            hot_size_gb = sum(tree.bytes for tree in hot_trees if tree) / (1024**3)
             
             # Calculate cold storage cost  
-            cold_size_gb = sum(
-                sum(os.path.getsize(os.path.join(root, file))
-                    for root, _, files in os.walk(path)
-                    for file in files if os.path.exists(os.path.join(root, file))
-                ) for path in self.media_paths.values() if os.path.exists(path)
-            ) / (1024**3)
+            cold_trees = [scan.tree(path) for path in self.media_paths.values()]
+            cold_size_gb = sum(tree.bytes for tree in cold_trees if tree) / (1024**3)
             
             storage_cost_estimate.labels(tier='hot').set(hot_size_gb * hot_storage_cost_per_gb)
             storage_cost_estimate.labels(tier='cold').set(cold_size_gb * cold_storage_cost_per_gb)
@@ -207,27 +312,24 @@ class BusinessMonitor:
     def analyze_processing_efficiency(self):
         """Analyze processing pipeline efficiency"""
         try:
+            scan = self.scan or self.refresh_scan()
+            
             # Calculate download-to-import efficiency
-            downloads_path = Path('/hot/downloads')
+            downloads_path = self.hot_paths['downloads']
             imported_count = 0
             total_downloads = 0
             
-            if downloads_path.exists():
-                # Count files in download folders vs imported files
+            if scan.tree(downloads_path):
+                # Count entries in download folders vs imported files
                 for media_type in ['movies', 'tv', 'music']:
-                    download_type_path = downloads_path / media_type
-                    if download_type_path.exists():
-                        download_files = len(list(download_type_path.rglob('*')))
-                        total_downloads += download_files
+                    download_tree = scan.child(downloads_path, media_type)
+                    if download_tree:
+                        total_downloads += download_tree.entries
                         
                         # Rough estimate: files modified in media library in last 24h
-                        media_path = Path(f'/media/{media_type}')
-                        if media_path.exists():
-                            recent_imports = sum(
-                                1 for f in media_path.rglob('*') 
-                                if f.is_file() and time.time() - f.stat().st_mtime < 86400
-                            )
-                            imported_count += recent_imports
+                        media_tree = scan.tree(self.media_paths[media_type])
+                        if media_tree:
+                            imported_count += media_tree.recent_files
                             
             if total_downloads > 0:
                 efficiency = (imported_count / total_downloads) * 100
@@ -236,8 +338,8 @@ class BusinessMonitor:
                 processing_efficiency.labels(stage='import').set(100)
                 
             # Manual processing efficiency (lower is better)
-            manual_path = Path('/hot/manual')
-            manual_files = len(list(manual_path.rglob('*'))) if manual_path.exists() else 0
+            manual_tree = scan.tree(self.manual_path)
+            manual_files = manual_tree.entries if manual_tree else 0
             manual_efficiency = max(0, 100 - (manual_files * 5))  # Penalty for manual files
             processing_efficiency.labels(stage='manual').set(manual_efficiency)
             
@@ -248,6 +350,9 @@ class BusinessMonitor:
         """Run one complete business monitoring cycle"""
         logger.info("Running business monitoring cycle...")
         
+        # One walk per cycle, shared by every collector below
+        self.refresh_scan()
+        
         self.calculate_library_metrics()
         self.calculate_storage_efficiency()
         self.estimate_costs()
@@ -259,12 +364,27 @@ def main():
     """Main business monitoring loop"""
     logger.info("Starting Business Metrics Monitor")
     
+    # push: refresh every 5 minutes in the background; pull: refresh when scraped
+    mode = os.getenv('BUSINESS_METRICS_MODE', 'push')
+    
+    monitor = BusinessMonitor()
+    
+    if mode == 'pull':
+        registry = CollectorRegistry()
+        registry.register(ScrapeCollector(monitor, float(os.getenv('BUSINESS_METRICS_TTL', '300'))))
+        start_http_server(9999, registry=registry)
+        logger.info("Business metrics server started on port 9999 (collecting on scrape)")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            logger.info("Shutting down business monitor...")
+        return
+    
     # Start Prometheus metrics server
     start_http_server(9999)
     logger.info("Business metrics server started on port 9999")
     
-    monitor = BusinessMonitor()
-    
     while True:
         try:
             monitor.run_monitoring_cycle()
@@ -412,7 +532,8 @@ def show_media_pipeline():
         queue_data = get_prometheus_data('download_queue_size')
         if queue_data["data"]["result"]:
             df_queue = pd.DataFrame([
-                {"Client": r["metric"]["client"], "Status": r["metric"]["status"], "Count": int(float(r["value"][1]))}
+                {"Node": r["metric"].get("node", ""), "Client": r["metric"]["client"],
+                 "Status": r["metric"]["status"], "Count": int(float(r["value"][1]))}
                 for r in queue_data["data"]["result"]
             ])
             st.dataframe(df_queue, use_container_width=True)
@@ -458,13 +579,15 @@ def show_performance_metrics():
     
     with col2:
         st.subheader("Service Response Times")
-        response_data = get_prometheus_data('service_response_time_seconds')
+        response_data = get_prometheus_data(
+            'histogram_quantile(0.95, sum by (service, le) (rate(service_response_time_seconds_bucket[5m])))'
+        )
         if response_data["data"]["result"]:
             df_response = pd.DataFrame([
                 {"Service": r["metric"]["service"], "Response Time": float(r["value"][1]) * 1000}
                 for r in response_data["data"]["result"]
             ])
-            fig = px.bar(df_response, x="Service", y="Response Time", title="Response Time (ms)")
+            fig = px.bar(df_response, x="Service", y="Response Time", title="p95 Response Time (ms)")
             st.plotly_chart(fig, use_container_width=True)
 
 def show_mobile_status():
@@ -135,7 +135,7 @@ EOF
       "title": "Download Queue Status",
       "type": "table",
       "targets": [
-        { "expr": "download_queue_size", "legendFormat": "{{client}} - {{status}}" }
+        { "expr": "download_queue_size", "legendFormat": "{{node}} {{client}} - {{status}}" }
       ],
       "gridPos": {"h": 8, "w": 12, "x": 0, "y": 0}
     },
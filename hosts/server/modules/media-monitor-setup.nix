@@ -18,11 +18,25 @@
       cp ${./media-monitor.py} /opt/monitoring/media-monitor/media_monitor.py
       chmod +x /opt/monitoring/media-monitor/media_monitor.py
       
+      # Host inventory: extra nodes to probe, labelled node="<name>" in every metric
+      cat > /opt/monitoring/media-monitor/nodes.json << 'EOF'
+{
+  "hwc-laptop": {
+    "services": {
+      "immich-ml": "http://hwc-laptop:3003/ping"
+    },
+    "queues": []
+  }
+}
+EOF
+
       # Create requirements.txt
       cat > /opt/monitoring/media-monitor/requirements.txt << 'EOF'
 prometheus_client==0.18.0
 psutil==5.9.6
 requests==2.31.0
+httpx==0.27.2
+inotify_simple==1.3.5
 EOF
 
       # Create Dockerfile for the monitor
@@ -8,13 +8,27 @@ import os
 import sys
 import time
 import json
+import errno
+import random
+import asyncio
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import httpx
 import psutil
 import requests
 from pathlib import Path
 from datetime import datetime, timedelta
-from prometheus_client import start_http_server, Gauge, Counter, Histogram, Info
+from prometheus_client import start_http_server, Gauge, Counter, Histogram, Info, CollectorRegistry, REGISTRY
 import logging
 
+# inotify is optional - without it the media index falls back to periodic reconciles
+try:
+    from inotify_simple import INotify, flags as inotify_flags
+except ImportError:
+    INotify = None
+    inotify_flags = None
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -23,7 +37,10 @@ logger = logging.getLogger(__name__)
 # Storage metrics
 hot_storage_usage = Gauge('hot_storage_usage_bytes', 'Hot storage usage in bytes', ['path'])
 cold_storage_usage = Gauge('cold_storage_usage_bytes', 'Cold storage usage in bytes', ['path'])
-download_queue_size = Gauge('download_queue_size', 'Number of files in download queue', ['client', 'status'])
+download_queue_size = Gauge('download_queue_size', 'Number of files in download queue', ['node', 'client', 'status'])
+download_queue_bytes = Gauge('download_queue_bytes', 'Bytes held in download queue', ['node', 'client', 'status'])
+queue_tracker_drift = Counter('queue_tracker_drift_total', 'Reconciles that found the live queue counters out of date', ['node', 'client', 'status'])
+download_queue_oldest_age = Gauge('download_queue_oldest_age_seconds', 'Age of the oldest file in download queue', ['node', 'client', 'status'])
 
 # Media processing metrics
 media_import_rate = Gauge('media_import_rate_per_hour', 'Media imports per hour', ['type'])
@@ -31,17 +48,921 @@ failed_imports = Counter('failed_imports_total', 'Total failed imports', ['type'
 processing_time = Histogram('media_processing_seconds', 'Time spent processing media', ['type', 'stage'])
 
 # Service health metrics
-service_response_time = Gauge('service_response_time_seconds', 'Service response time', ['service'])
-service_up = Gauge('service_up', 'Service availability', ['service'])
+service_response_time = Histogram('service_response_time_seconds', 'Service health probe latency (timeouts count as the full deadline)',
+                                  ['node', 'service', 'outcome'],
+                                  buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0))
+service_up = Gauge('service_up', 'Service availability', ['node', 'service'])
 active_transcoding = Gauge('jellyfin_active_transcoding', 'Number of active transcoding sessions')
 
+# Jellyfin transcoding telemetry
+jellyfin_sessions = Gauge('jellyfin_active_sessions', 'Jellyfin sessions currently playing')
+jellyfin_transcodes = Gauge('jellyfin_transcode_sessions', 'Active transcodes by target codec and acceleration', ['video_codec', 'hw_accel'])
+jellyfin_transcode_bitrate = Gauge('jellyfin_transcode_bitrate_bps', 'Combined output bitrate of active transcodes', ['hw_accel'])
+jellyfin_transcode_fps = Histogram('jellyfin_transcode_fps', 'Per-session transcode frame rate, sampled every poll', ['hw_accel'],
+                                   buckets=(5, 10, 15, 20, 24, 30, 45, 60, 90, 120, 240))
+jellyfin_transcode_speed = Histogram('jellyfin_transcode_realtime_ratio', 'Transcode fps divided by source fps, sampled every poll', ['hw_accel'],
+                                     buckets=(0.25, 0.5, 0.75, 0.9, 1.0, 1.25, 1.5, 2.0, 3.0, 5.0))
+jellyfin_below_realtime = Gauge('jellyfin_transcode_below_realtime', 'Transcodes running slower than the source frame rate', ['hw_accel'])
+
 # Business metrics
 api_requests = Counter('business_api_requests_total', 'Total API requests', ['endpoint', 'method'])
 data_processing_jobs = Gauge('data_processing_jobs_active', 'Active data processing jobs', ['type'])
 
+# Media index metrics
+media_index_files = Gauge('media_index_files', 'Files tracked in the media index', ['type'])
+media_index_reconcile_seconds = Gauge('media_index_reconcile_seconds', 'Duration of the last full media index reconcile')
+media_index_last_reconcile = Gauge('media_index_last_reconcile_timestamp', 'Unix time of the last full media index reconcile')
+media_index_events = Counter('media_index_events_total', 'Filesystem events applied to the media index', ['type'])
+
+# Collector scheduling metrics
+collector_duration = Histogram('monitor_collector_duration_seconds', 'Collector run duration', ['collector'])
+collector_last_success = Gauge('monitor_collector_last_success_timestamp', 'Unix time of the last successful collector run', ['collector'])
+collector_timeouts = Counter('monitor_collector_timeouts_total', 'Collector runs that exceeded their timeout', ['collector'])
+collector_failures = Counter('monitor_collector_failures_total', 'Collector runs that raised', ['collector'])
+
 # System info
 system_info = Info('system_info', 'System information')
 
+
+class TreeWatcher:
+    """Recursive inotify watcher that forwards changes under a set of roots to a callback.
+
+    The callback is called as on_event(path, is_dir, removed). A new directory is
+    reported once (is_dir=True) after its subtree has been watched, so the consumer
+    should scan it. Queue overflows and watch-limit exhaustion are reported through
+    on_overflow so the consumer can schedule a full reconcile.
+    """
+
+    def __init__(self, roots, on_event, on_overflow=None):
+        self.roots = [str(root) for root in roots]
+        self.on_event = on_event
+        self.on_overflow = on_overflow
+        self.inotify = INotify()
+        self.wd_to_path = {}
+        self.degraded = False
+        self.thread = None
+
+        self.watch_mask = (
+            inotify_flags.CREATE | inotify_flags.CLOSE_WRITE | inotify_flags.ATTRIB |
+            inotify_flags.MOVED_TO | inotify_flags.MOVED_FROM |
+            inotify_flags.DELETE | inotify_flags.DELETE_SELF
+        )
+
+    @staticmethod
+    def available():
+        """Whether inotify support is installed"""
+        return INotify is not None
+
+    def add_tree(self, root):
+        """Watch root and every directory below it"""
+        stack = [root]
+        while stack:
+            directory = stack.pop()
+            try:
+                wd = self.inotify.add_watch(directory, self.watch_mask)
+            except OSError as e:
+                if e.errno == errno.ENOSPC:
+                    if not self.degraded:
+                        logger.warning(f"inotify watch limit reached at {directory}; "
+                                       "raise fs.inotify.max_user_watches")
+                        self.degraded = True
+                        if self.on_overflow:
+                            self.on_overflow()
+                    return
+                continue
+            self.wd_to_path[wd] = directory
+
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+            except OSError:
+                continue
+
+    def start(self):
+        """Watch all roots and start the event thread"""
+        for root in self.roots:
+            if os.path.isdir(root):
+                self.add_tree(root)
+        logger.info(f"Watching {len(self.wd_to_path)} directories under {', '.join(self.roots)}")
+
+        self.thread = threading.Thread(target=self._run, name='tree-watcher', daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                for event in self.inotify.read(timeout=1000, read_delay=100):
+                    self._handle(event)
+            except Exception as e:
+                logger.error(f"Error handling inotify events: {e}")
+                time.sleep(1)
+
+    def _handle(self, event):
+        if event.mask & inotify_flags.Q_OVERFLOW:
+            logger.warning("inotify queue overflowed; scheduling reconcile")
+            if self.on_overflow:
+                self.on_overflow()
+            return
+
+        if event.mask & inotify_flags.IGNORED:
+            self.wd_to_path.pop(event.wd, None)
+            return
+
+        parent = self.wd_to_path.get(event.wd)
+        if parent is None or not event.name:
+            return
+
+        path = os.path.join(parent, event.name)
+        is_dir = bool(event.mask & inotify_flags.ISDIR)
+        removed = bool(event.mask & (inotify_flags.DELETE | inotify_flags.MOVED_FROM))
+
+        if is_dir and not removed:
+            # Watch the new subtree before scanning it so nothing lands unseen
+            self.add_tree(path)
+        self.on_event(path, is_dir, removed)
+
+
+class MediaIndex:
+    """Persistent SQLite index of path -> (size, mtime, inode) for the media library.
+
+    A full reconcile walks the library and rewrites the index; between reconciles
+    the index is kept current from inotify events, so queries never touch the disks.
+    """
+
+    BATCH_SIZE = 1000
+
+    def __init__(self, db_path, roots):
+        self.db_path = db_path
+        self.roots = roots  # media type -> root path
+        self.lock = threading.Lock()
+        self.reconcile_requested = threading.Event()
+        self.watcher = None
+        self.thread = None
+
+        self.reconcile_interval = float(os.getenv('MEDIA_INDEX_RECONCILE_HOURS', '24')) * 3600
+        # Without inotify the index only changes on reconcile, so do it more often
+        self.fallback_interval = float(os.getenv('MEDIA_INDEX_FALLBACK_MINUTES', '15')) * 60
+
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                type TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime REAL NOT NULL,
+                inode INTEGER NOT NULL,
+                seen REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS files_type_mtime ON files (type, mtime);
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+        """)
+        self.conn.commit()
+
+    @property
+    def last_reconcile(self):
+        """Unix time of the last completed reconcile, 0 if never"""
+        with self.lock:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = 'last_reconcile'").fetchone()
+        return float(row[0]) if row else 0.0
+
+    @property
+    def ready(self):
+        """Whether the index has been populated at least once"""
+        return self.last_reconcile > 0
+
+    def type_for_path(self, path):
+        """Return the media type whose root contains path"""
+        for media_type, root in self.roots.items():
+            if path == root or path.startswith(root.rstrip('/') + '/'):
+                return media_type
+        return None
+
+    def _upsert_rows(self, rows):
+        with self.lock:
+            self.conn.executemany("""
+                INSERT INTO files (path, type, size, mtime, inode, seen) VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(path) DO UPDATE SET
+                    size = excluded.size, mtime = excluded.mtime,
+                    inode = excluded.inode, seen = excluded.seen
+            """, rows)
+            self.conn.commit()
+
+    def _scan_tree(self, root, media_type, seen):
+        """Walk a subtree with os.scandir and upsert every regular file"""
+        rows = []
+        stack = [root]
+        while stack:
+            directory = stack.pop()
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                stack.append(entry.path)
+                            elif entry.is_file(follow_symlinks=False):
+                                st = entry.stat(follow_symlinks=False)
+                                rows.append((entry.path, media_type, st.st_size, st.st_mtime, st.st_ino, seen))
+                        except OSError:
+                            continue
+            except OSError:
+                continue
+
+            if len(rows) >= self.BATCH_SIZE:
+                self._upsert_rows(rows)
+                rows = []
+
+        if rows:
+            self._upsert_rows(rows)
+
+    def reconcile(self):
+        """Walk the whole library and bring the index in line with the disks"""
+        started = time.time()
+        logger.info("Reconciling media index...")
+
+        for media_type, root in self.roots.items():
+            if not os.path.isdir(root):
+                continue
+            self._scan_tree(root, media_type, started)
+            # Anything not touched by this walk (or by an event since it began) is gone
+            with self.lock:
+                self.conn.execute("DELETE FROM files WHERE type = ? AND seen < ?", (media_type, started))
+                self.conn.commit()
+
+        finished = time.time()
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('last_reconcile', ?)", (str(finished),)
+            )
+            self.conn.commit()
+
+        media_index_reconcile_seconds.set(finished - started)
+        media_index_last_reconcile.set(finished)
+        for media_type, count in self.counts().items():
+            media_index_files.labels(type=media_type).set(count)
+        logger.info(f"Media index reconciled in {finished - started:.1f}s")
+
+    def apply_event(self, path, is_dir, removed):
+        """Apply one filesystem event from TreeWatcher"""
+        media_type = self.type_for_path(path)
+        if media_type is None:
+            return
+        media_index_events.labels(type=media_type).inc()
+
+        if removed:
+            with self.lock:
+                if is_dir:
+                    prefix = path.rstrip('/') + '/'
+                    self.conn.execute(
+                        "DELETE FROM files WHERE path >= ? AND path < ?", (prefix, prefix[:-1] + '0')
+                    )
+                else:
+                    self.conn.execute("DELETE FROM files WHERE path = ?", (path,))
+                self.conn.commit()
+            return
+
+        if is_dir:
+            self._scan_tree(path, media_type, time.time())
+            return
+
+        try:
+            st = os.stat(path, follow_symlinks=False)
+        except OSError:
+            return
+        self._upsert_rows([(path, media_type, st.st_size, st.st_mtime, st.st_ino, time.time())])
+
+    def count_modified_since(self, media_type, since):
+        """Count indexed files of a media type with mtime after since"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT COUNT(*) FROM files WHERE type = ? AND mtime > ?", (media_type, since)
+            ).fetchone()
+        return row[0]
+
+    def counts(self):
+        """Return indexed file counts per media type"""
+        with self.lock:
+            rows = self.conn.execute("SELECT type, COUNT(*) FROM files GROUP BY type").fetchall()
+        return dict(rows)
+
+    def start(self):
+        """Start the inotify watcher and the background reconcile thread"""
+        if TreeWatcher.available():
+            self.watcher = TreeWatcher(
+                self.roots.values(), self.apply_event, on_overflow=self.reconcile_requested.set
+            )
+            self.watcher.start()
+        else:
+            logger.warning("inotify_simple not installed; media index will only refresh on reconcile")
+
+        # The watcher only sees changes from now on; catch up on whatever happened
+        # while the monitor was down, whenever the last reconcile was
+        self.reconcile_requested.set()
+        self.thread = threading.Thread(target=self._run, name='media-index', daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            if self.watcher and not self.watcher.degraded:
+                interval = self.reconcile_interval
+            else:
+                interval = self.fallback_interval
+
+            if self.reconcile_requested.is_set() or time.time() - self.last_reconcile >= interval:
+                self.reconcile_requested.clear()
+                try:
+                    self.reconcile()
+                except Exception as e:
+                    logger.error(f"Error reconciling media index: {e}")
+
+            self.reconcile_requested.wait(timeout=60)
+
+
+class QueueStats:
+    """Totals for one queue directory, gathered in a single scandir pass"""
+
+    def __init__(self):
+        self.files = 0
+        self.dirs = 0
+        self.bytes = 0
+        self.oldest_mtime = None
+
+    @property
+    def entries(self):
+        """Files plus directories, matching the old glob('**/*') count"""
+        return self.files + self.dirs
+
+    def oldest_age(self, now=None):
+        """Seconds since the oldest file was last modified, 0 if empty"""
+        if self.oldest_mtime is None:
+            return 0
+        return max(0, (now or time.time()) - self.oldest_mtime)
+
+
+def scan_queue(path, max_depth=None):
+    """Stream a directory tree with os.scandir and return its QueueStats.
+
+    Nothing is materialised: entries are counted as they are read. Directories
+    deeper than max_depth below path are counted but not descended into.
+    """
+    stats = QueueStats()
+    stack = [(path, 0)]
+    while stack:
+        directory, depth = stack.pop()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stats.dirs += 1
+                            if max_depth is None or depth < max_depth:
+                                stack.append((entry.path, depth + 1))
+                            continue
+                        st = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    stats.files += 1
+                    stats.bytes += st.st_size
+                    if stats.oldest_mtime is None or st.st_mtime < stats.oldest_mtime:
+                        stats.oldest_mtime = st.st_mtime
+        except OSError:
+            continue
+    return stats
+
+
+class QueueTracker:
+    """Event-driven download queue counters for the hot tier.
+
+    Each queue keeps an in-memory map of path -> (is_dir, size, mtime) that
+    TreeWatcher events update as files land, plus an order-independent checksum
+    (XOR of entry hashes) that is maintained incrementally. A periodic reconcile
+    recomputes the checksum with a streaming walk and only rebuilds a queue's
+    state when the two disagree.
+    """
+
+    def __init__(self, queues, reconcile_interval=300, publish_interval=0.5):
+        self.queues = {path: (node, client, status) for node, client, status, path in queues}
+        self.reconcile_interval = reconcile_interval
+        self.publish_interval = publish_interval
+        self.entries = {path: {} for path in self.queues}
+        self.checksums = {path: 0 for path in self.queues}
+        self.dirty = set(self.queues)
+        self.oldest_mtime = {path: None for path in self.queues}
+        self.watched = set()
+        self.lock = threading.Lock()
+        self.reconcile_requested = threading.Event()
+        self.watcher = None
+        self.thread = None
+
+    @property
+    def running(self):
+        """Whether the tracker owns the queue gauges"""
+        return self.thread is not None and self.thread.is_alive()
+
+    def queue_for_path(self, path):
+        """Return the queue root that contains path"""
+        for root in self.queues:
+            if path.startswith(root.rstrip('/') + '/'):
+                return root
+        return None
+
+    @staticmethod
+    def _entry_hash(path, entry):
+        return hash((path, entry))
+
+    def _set(self, root, path, entry):
+        entries = self.entries[root]
+        old = entries.get(path)
+        if old is not None:
+            self.checksums[root] ^= self._entry_hash(path, old)
+        entries[path] = entry
+        self.checksums[root] ^= self._entry_hash(path, entry)
+
+    def _discard(self, root, path, is_dir):
+        entries = self.entries[root]
+        prefix = path.rstrip('/') + '/'
+        doomed = [path] if path in entries else []
+        if is_dir:
+            doomed.extend(key for key in entries if key.startswith(prefix))
+        for key in doomed:
+            self.checksums[root] ^= self._entry_hash(key, entries.pop(key))
+
+    @staticmethod
+    def _stat_entry(path, is_dir):
+        if is_dir:
+            return (True, 0, 0)
+        st = os.stat(path, follow_symlinks=False)
+        return (False, st.st_size, st.st_mtime_ns)
+
+    def _walk(self, directory):
+        """Yield (path, entry) for everything below directory"""
+        stack = [directory]
+        while stack:
+            current = stack.pop()
+            try:
+                with os.scandir(current) as entries:
+                    for entry in entries:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                stack.append(entry.path)
+                                yield entry.path, (True, 0, 0)
+                            else:
+                                st = entry.stat(follow_symlinks=False)
+                                yield entry.path, (False, st.st_size, st.st_mtime_ns)
+                        except OSError:
+                            continue
+            except OSError:
+                continue
+
+    def apply_event(self, path, is_dir, removed):
+        """Apply one filesystem event from TreeWatcher"""
+        root = self.queue_for_path(path)
+        if root is None:
+            return
+
+        with self.lock:
+            if removed:
+                self._discard(root, path, is_dir)
+            else:
+                try:
+                    self._set(root, path, self._stat_entry(path, is_dir))
+                except OSError:
+                    self._discard(root, path, is_dir)
+                if is_dir:
+                    # A new directory may already hold files that landed before its watch
+                    for child_path, entry in self._walk(path):
+                        self._set(root, child_path, entry)
+            self.dirty.add(root)
+
+    def stats(self, root):
+        """Build QueueStats for a queue from the live state"""
+        stats = QueueStats()
+        with self.lock:
+            for is_dir, size, mtime_ns in self.entries[root].values():
+                if is_dir:
+                    stats.dirs += 1
+                    continue
+                stats.files += 1
+                stats.bytes += size
+                mtime = mtime_ns / 1e9
+                if stats.oldest_mtime is None or mtime < stats.oldest_mtime:
+                    stats.oldest_mtime = mtime
+        return stats
+
+    def publish(self):
+        """Push every changed queue to the download queue gauges.
+
+        Size and bytes only change with events, so they are rebuilt for dirty queues;
+        the oldest-entry age grows on its own and is refreshed for every queue.
+        """
+        with self.lock:
+            dirty, self.dirty = self.dirty, set()
+        now = time.time()
+        for root in dirty:
+            node, client, status = self.queues[root]
+            stats = self.stats(root)
+            self.oldest_mtime[root] = stats.oldest_mtime
+            download_queue_size.labels(node=node, client=client, status=status).set(stats.entries)
+            download_queue_bytes.labels(node=node, client=client, status=status).set(stats.bytes)
+        for root, (node, client, status) in self.queues.items():
+            oldest = self.oldest_mtime[root]
+            download_queue_oldest_age.labels(node=node, client=client, status=status).set(
+                0 if oldest is None else max(0, now - oldest)
+            )
+
+    def reconcile(self):
+        """Compare each queue's checksum with the disk and rebuild it on drift"""
+        for root, (node, client, status) in self.queues.items():
+            if not os.path.isdir(root):
+                continue
+            if root not in self.watched:
+                self.watcher.add_tree(root)
+                self.watched.add(root)
+
+            # Hold the lock so events for this queue wait instead of racing the walk
+            with self.lock:
+                checksum = 0
+                count = 0
+                for path, entry in self._walk(root):
+                    checksum ^= self._entry_hash(path, entry)
+                    count += 1
+                if checksum == self.checksums[root] and count == len(self.entries[root]):
+                    continue
+
+                if self.entries[root]:
+                    logger.info(f"Queue {root} drifted from disk, rebuilding")
+                    queue_tracker_drift.labels(node=node, client=client, status=status).inc()
+                self.entries[root] = {}
+                self.checksums[root] = 0
+                for path, entry in self._walk(root):
+                    self._set(root, path, entry)
+                self.dirty.add(root)
+
+    def start(self):
+        """Watch the queues and start the publish/reconcile thread"""
+        self.watcher = TreeWatcher(self.queues, self.apply_event, on_overflow=self.reconcile_requested.set)
+        self.watcher.start()
+        self.watched = {root for root in self.queues if os.path.isdir(root)}
+        self.thread = threading.Thread(target=self._run, name='queue-tracker', daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        last_reconcile = float('-inf')
+        while True:
+            try:
+                if self.reconcile_requested.is_set() or time.monotonic() - last_reconcile >= self.reconcile_interval:
+                    self.reconcile_requested.clear()
+                    self.reconcile()
+                    last_reconcile = time.monotonic()
+                self.publish()
+            except Exception as e:
+                logger.error(f"Error tracking download queues: {e}")
+            time.sleep(self.publish_interval)
+
+
+class JellyfinCollector:
+    """Jellyfin session and transcoding telemetry from one /Sessions call per poll.
+
+    Uses a persistent requests session, authenticated when JELLYFIN_API_KEY is set
+    (without a key Jellyfin only returns the caller's own sessions). hw_accel is
+    Jellyfin's HardwareAccelerationType, or "none" for a software transcode; video
+    that is passed through is reported as codec "copy". With NVENC configured, a
+    rising "none" count or sessions below realtime means the GPU is saturated.
+    """
+
+    def __init__(self, base_url, api_key=None, timeout=5):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.session = requests.Session()
+        if api_key:
+            self.session.headers['Authorization'] = f'MediaBrowser Token="{api_key}"'
+
+    def fetch_sessions(self):
+        """Return sessions active within the last few minutes"""
+        response = self.session.get(
+            f"{self.base_url}/Sessions", params={'ActiveWithinSeconds': 300}, timeout=self.timeout
+        )
+        response.raise_for_status()
+        return response.json()
+
+    @staticmethod
+    def source_fps(session):
+        """Frame rate of the playing item's video stream, if Jellyfin reports it"""
+        for stream in (session.get('NowPlayingItem') or {}).get('MediaStreams') or []:
+            if stream.get('Type') == 'Video':
+                return stream.get('RealFrameRate') or stream.get('AverageFrameRate')
+        return None
+
+    def collect(self):
+        """Poll Jellyfin once and update every transcoding metric"""
+        sessions = self.fetch_sessions()
+        playing = [session for session in sessions if session.get('NowPlayingItem')]
+
+        transcodes = {}
+        bitrates = {}
+        below_realtime = {}
+        for session in playing:
+            info = session.get('TranscodingInfo')
+            if not info:
+                continue
+
+            hw_accel = (info.get('HardwareAccelerationType') or 'none').lower()
+            video_codec = 'copy' if info.get('IsVideoDirect') else (info.get('VideoCodec') or 'unknown').lower()
+            transcodes[(video_codec, hw_accel)] = transcodes.get((video_codec, hw_accel), 0) + 1
+            bitrates[hw_accel] = bitrates.get(hw_accel, 0) + (info.get('Bitrate') or 0)
+            below_realtime.setdefault(hw_accel, 0)
+
+            fps = info.get('Framerate')
+            if fps and not info.get('IsVideoDirect'):
+                jellyfin_transcode_fps.labels(hw_accel=hw_accel).observe(fps)
+                source_fps = self.source_fps(session)
+                if source_fps:
+                    ratio = fps / source_fps
+                    jellyfin_transcode_speed.labels(hw_accel=hw_accel).observe(ratio)
+                    if ratio < 1.0:
+                        below_realtime[hw_accel] += 1
+
+        # Drop label sets from sessions that have ended
+        jellyfin_transcodes.clear()
+        jellyfin_transcode_bitrate.clear()
+        jellyfin_below_realtime.clear()
+        for (video_codec, hw_accel), count in transcodes.items():
+            jellyfin_transcodes.labels(video_codec=video_codec, hw_accel=hw_accel).set(count)
+        for hw_accel, bitrate in bitrates.items():
+            jellyfin_transcode_bitrate.labels(hw_accel=hw_accel).set(bitrate)
+        for hw_accel, count in below_realtime.items():
+            jellyfin_below_realtime.labels(hw_accel=hw_accel).set(count)
+
+        jellyfin_sessions.set(len(playing))
+        active_transcoding.set(sum(transcodes.values()))
+
+
+class HealthProbe:
+    """A single service health endpoint with its own deadline and interval"""
+
+    def __init__(self, node, service, url, interval=30.0, deadline=5.0):
+        self.node = node
+        self.service = service
+        self.url = url
+        self.interval = interval
+        self.deadline = deadline
+
+
+class HealthCheckEngine:
+    """Concurrent asyncio health checker sharing one keep-alive HTTP client.
+
+    In the background each probe runs on its own jittered interval so probes
+    never line up; run_once fires every probe at the same time for a single sweep.
+    """
+
+    def __init__(self, probes, jitter=0.2):
+        self.probes = probes
+        self.jitter = jitter
+        self.thread = None
+
+    @property
+    def running(self):
+        """Whether the background probe loop is active"""
+        return self.thread is not None and self.thread.is_alive()
+
+    def _client(self):
+        limits = httpx.Limits(max_connections=len(self.probes) * 2, max_keepalive_connections=len(self.probes))
+        return httpx.AsyncClient(limits=limits, timeout=None)
+
+    async def probe(self, client, probe):
+        """Probe one service and record availability and latency.
+
+        Failed probes are observed too (outcome label), so the slowest samples
+        aren't missing from the latency distribution.
+        """
+        start_time = time.monotonic()
+        outcome = 'error'
+        try:
+            response = await asyncio.wait_for(client.get(probe.url), timeout=probe.deadline)
+            healthy = response.status_code == 200
+            outcome = 'ok' if healthy else 'unhealthy'
+            service_up.labels(node=probe.node, service=probe.service).set(1 if healthy else 0)
+            return healthy
+        except asyncio.TimeoutError:
+            outcome = 'timeout'
+            logger.warning(f"Service {probe.service} on {probe.node} health check timed out after {probe.deadline}s")
+            service_up.labels(node=probe.node, service=probe.service).set(0)
+            return False
+        except Exception as e:
+            logger.warning(f"Service {probe.service} on {probe.node} health check failed: {e!r}")
+            service_up.labels(node=probe.node, service=probe.service).set(0)
+            return False
+        finally:
+            elapsed = probe.deadline if outcome == 'timeout' else time.monotonic() - start_time
+            service_response_time.labels(node=probe.node, service=probe.service, outcome=outcome).observe(elapsed)
+
+    async def run_once(self):
+        """Probe every service concurrently, once"""
+        async with self._client() as client:
+            return await asyncio.gather(*(self.probe(client, probe) for probe in self.probes))
+
+    async def _probe_loop(self, client, probe):
+        # Spread the first round over the interval so probes don't fire in lockstep
+        await asyncio.sleep(random.uniform(0, probe.interval))
+        while True:
+            await self.probe(client, probe)
+            await asyncio.sleep(probe.interval * random.uniform(1 - self.jitter, 1 + self.jitter))
+
+    async def _run_forever(self):
+        async with self._client() as client:
+            await asyncio.gather(*(self._probe_loop(client, probe) for probe in self.probes))
+
+    def start(self):
+        """Run the probe loops on a dedicated event loop thread"""
+        self.thread = threading.Thread(
+            target=lambda: asyncio.run(self._run_forever()), name='health-checks', daemon=True
+        )
+        self.thread.start()
+        logger.info(f"Health check engine started with {len(self.probes)} probes")
+
+
+class CollectorSpec:
+    """A collector function with its own interval, timeout and concurrency limit.
+
+    ttl only matters in pull mode: 0 means the collector is cheap enough to run on
+    every scrape, otherwise its last result is served for up to ttl seconds.
+    Defaults to the interval.
+    """
+
+    def __init__(self, name, func, interval, timeout, max_concurrency=1, ttl=None):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self.ttl = interval if ttl is None else ttl
+
+
+def run_collector(spec):
+    """Run one collector and record its duration and outcome.
+
+    Collectors log their own errors and return True on success, False on failure;
+    raising counts as a failure too.
+    """
+    start_time = time.monotonic()
+    try:
+        ok = bool(spec.func())
+    except Exception as e:
+        logger.error(f"Collector {spec.name} failed: {e}")
+        ok = False
+    finally:
+        collector_duration.labels(collector=spec.name).observe(time.monotonic() - start_time)
+
+    if not ok:
+        collector_failures.labels(collector=spec.name).inc()
+        return False
+
+    if time.monotonic() - start_time <= spec.timeout:
+        collector_last_success.labels(collector=spec.name).set(time.time())
+        return True
+    return False
+
+
+class CollectorScheduler:
+    """Runs each collector on its own cadence on a shared worker pool.
+
+    A run that outlives its timeout cannot be killed (it is a thread), but it is
+    counted as a timeout, doesn't update the last-success timestamp, and keeps
+    holding its concurrency slot so a stuck collector can't pile up runs.
+    """
+
+    def __init__(self, specs, workers=None):
+        self.specs = specs
+        self.workers = workers or sum(spec.max_concurrency for spec in specs)
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='collector')
+        self.next_run = {spec.name: 0.0 for spec in specs}
+        self.in_flight = {spec.name: [] for spec in specs}  # [future, started, flagged]
+
+    def tick(self):
+        """Submit every collector that is due and has a free concurrency slot"""
+        now = time.monotonic()
+        for spec in self.specs:
+            running = [flight for flight in self.in_flight[spec.name] if not flight[0].done()]
+            self.in_flight[spec.name] = running
+
+            for flight in running:
+                if not flight[2] and now - flight[1] > spec.timeout:
+                    logger.warning(f"Collector {spec.name} exceeded its {spec.timeout:.0f}s timeout")
+                    collector_timeouts.labels(collector=spec.name).inc()
+                    flight[2] = True
+
+            if now >= self.next_run[spec.name] and len(running) < spec.max_concurrency:
+                future = self.executor.submit(run_collector, spec)
+                running.append([future, now, False])
+                self.next_run[spec.name] = now + spec.interval
+
+    def run_forever(self, resolution=0.5):
+        """Schedule collectors until interrupted"""
+        logger.info(f"Scheduling {len(self.specs)} collectors on {self.workers} workers")
+        while True:
+            self.tick()
+            time.sleep(resolution)
+
+
+class ScrapeCollector:
+    """Custom collector that refreshes metrics when /metrics is scraped.
+
+    Collectors with ttl=0 are cheap and run inside every scrape. The rest never
+    block a scrape: once their cached result is older than their ttl a single
+    background refresh is started and the previous values keep being served from
+    source_registry until it finishes.
+    """
+
+    def __init__(self, specs, source_registry=REGISTRY):
+        self.specs = specs
+        self.source_registry = source_registry
+        self.refreshed = {}
+        self.in_flight = set()
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=len(specs), thread_name_prefix='scrape')
+
+    def _background(self, spec, started):
+        try:
+            if run_collector(spec):
+                self.refreshed[spec.name] = started
+        finally:
+            with self.lock:
+                self.in_flight.discard(spec.name)
+
+    def refresh(self):
+        """Run cheap collectors now and start background refreshes for expired ones"""
+        now = time.monotonic()
+        cheap = []
+        for spec in self.specs:
+            if spec.ttl == 0:
+                cheap.append(spec)
+            elif spec.name not in self.in_flight and now - self.refreshed.get(spec.name, float('-inf')) >= spec.ttl:
+                self.in_flight.add(spec.name)
+                self.executor.submit(self._background, spec, now)
+        list(self.executor.map(run_collector, cheap))
+
+    def collect(self):
+        # Serialise concurrent scrapes so an expired collector is only started once
+        with self.lock:
+            self.refresh()
+        yield from self.source_registry.collect()
+
+
+def load_inventory(local_node, local_services, local_queues):
+    """Load the host inventory the monitor collects from.
+
+    MONITOR_NODES_FILE (default /app/nodes.json) maps node name to
+    {"services": {name: base_url}, "queues": [{"client", "status", "path"}]}.
+    Services are probed over HTTP wherever the node is; queue paths must be
+    readable from the monitor (e.g. an NFS mount of the node's spool), and are
+    polled rather than watched since inotify doesn't see remote changes.
+    The local node always gets the built-in services and queues.
+    """
+    nodes = {local_node: {'services': dict(local_services), 'queues': list(local_queues), 'local': True}}
+
+    inventory_file = os.getenv('MONITOR_NODES_FILE', '/app/nodes.json')
+    if not os.path.exists(inventory_file):
+        return nodes
+
+    try:
+        with open(inventory_file) as f:
+            inventory = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.error(f"Error loading host inventory {inventory_file}: {e}")
+        return nodes
+
+    if not isinstance(inventory, dict):
+        logger.error(f"Host inventory {inventory_file} is not a JSON object, ignoring it")
+        return nodes
+
+    for node, spec in inventory.items():
+        if not isinstance(spec, dict):
+            logger.error(f"Skipping node {node} in {inventory_file}: expected an object")
+            continue
+        entry = nodes.setdefault(node, {'services': {}, 'queues': [], 'local': False})
+        services = spec.get('services', {})
+        if isinstance(services, dict):
+            entry['services'].update(services)
+        else:
+            logger.error(f"Skipping services of node {node} in {inventory_file}: expected an object")
+        for queue in spec.get('queues', []):
+            missing = [key for key in ('client', 'status', 'path') if not isinstance(queue, dict) or not queue.get(key)]
+            if missing:
+                logger.error(f"Skipping queue {queue!r} of node {node} in {inventory_file}: missing {', '.join(missing)}")
+                continue
+            entry['queues'].append((queue['client'], queue['status'], queue['path']))
+
+    logger.info(f"Monitoring {len(nodes)} nodes: {', '.join(nodes)}")
+    return nodes
+
+
 class MediaMonitor:
     def __init__(self):
         self.services = {
@@ -55,16 +976,53 @@ class MediaMonitor:
             'home-assistant': 'http://host.containers.internal:8123'
         }
         
+        # Mount points inside the container; overridable for benchmarks
+        self.media_root = os.getenv('MONITOR_MEDIA_ROOT', '/media')
+        self.hot_root = os.getenv('MONITOR_HOT_ROOT', '/hot')
+        
         self.storage_paths = {
-            'hot_downloads': '/hot/downloads',
-            'hot_cache': '/hot/cache',
-            'hot_processing': '/hot/processing',
-            'hot_manual': '/hot/manual',
-            'hot_quarantine': '/hot/quarantine',
-            'cold_media': '/media',
+            'hot_downloads': f'{self.hot_root}/downloads',
+            'hot_cache': f'{self.hot_root}/cache',
+            'hot_processing': f'{self.hot_root}/processing',
+            'hot_manual': f'{self.hot_root}/manual',
+            'hot_quarantine': f'{self.hot_root}/quarantine',
+            'cold_media': self.media_root,
             'downloads_config': '/downloads'
         }
         
+        # Every node we collect from; metrics carry a node label
+        self.node = os.getenv('MONITOR_NODE', 'hwc-server')
+        self.nodes = load_inventory(self.node, self.services, self.local_queue_paths())
+        
+        # Worker pool and depth bound for download queue scans
+        self.queue_executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv('QUEUE_SCAN_WORKERS', '4')), thread_name_prefix='queue-scan'
+        )
+        self.queue_max_depth = int(os.getenv('QUEUE_SCAN_MAX_DEPTH', '16'))
+        
+        # Event-driven queue counters; replaces polling count_download_queues once started
+        self.queue_tracker = QueueTracker(
+            self.queue_paths(local=True), reconcile_interval=float(os.getenv('QUEUE_RECONCILE_SECONDS', '300'))
+        )
+        
+        # Persistent, authenticated Jellyfin API session
+        self.jellyfin = JellyfinCollector(self.services['jellyfin'], os.getenv('JELLYFIN_API_KEY'))
+        
+        # Concurrent health probes, one per service
+        probe_interval = float(os.getenv('HEALTH_CHECK_INTERVAL', '30'))
+        probe_deadline = float(os.getenv('HEALTH_CHECK_TIMEOUT', '5'))
+        self.health_engine = HealthCheckEngine([
+            HealthProbe(node, name, self.health_url(name, base_url), probe_interval, probe_deadline)
+            for node, spec in self.nodes.items()
+            for name, base_url in spec['services'].items()
+        ])
+        
+        # Persistent index of the media library, kept current by inotify
+        self.media_index = MediaIndex(
+            os.getenv('MEDIA_INDEX_DB', '/app/state/media_index.db'),
+            {media_type: f'{self.media_root}/{media_type}' for media_type in ['music', 'movies', 'tv']}
+        )
+        
         # Initialize system info
         self.update_system_info()
         
@@ -92,127 +1050,108 @@ class MediaMonitor:
                         cold_storage_usage.labels(path=name).set(usage.used)
                         
                     logger.debug(f"Storage {name}: {usage.used / (1024**3):.2f} GB used")
+            return True
         except Exception as e:
             logger.error(f"Error checking storage usage: {e}")
+            return False
             
-    def count_download_queues(self):
+    def local_queue_paths(self):
+        """Return (client, status, path) for this node's download and processing queues"""
+        queues = [
+            ('qbittorrent', 'downloading', f'{self.hot_root}/downloads/torrents'),
+            ('sabnzbd', 'downloading', f'{self.hot_root}/downloads/usenet'),
+        ]
+        for media_type in ['music', 'movies', 'tv']:
+            for stage in ['processing', 'manual', 'quarantine']:
+                queues.append(('arr', f'{stage}_{media_type}', f'{self.hot_root}/{stage}/{media_type}'))
+        return queues
+        
+    def queue_paths(self, local=None):
+        """Return (node, client, status, path) for queues on every node, or only local/remote ones"""
+        return [
+            (node, client, status, path)
+            for node, spec in self.nodes.items()
+            if local is None or spec['local'] == local
+            for client, status, path in spec['queues']
+        ]
+        
+    def count_download_queues(self, queues=None):
         """Count files in download queues"""
         try:
-            # Count torrent downloads
-            torrent_path = Path('/hot/downloads/torrents')
-            if torrent_path.exists():
-                download_queue_size.labels(client='qbittorrent', status='downloading').set(
-                    len(list(torrent_path.glob('**/*')))
-                )
-                
-            # Count usenet downloads  
-            usenet_path = Path('/hot/downloads/usenet')
-            if usenet_path.exists():
-                download_queue_size.labels(client='sabnzbd', status='downloading').set(
-                    len(list(usenet_path.glob('**/*')))
-                )
-                
-            # Count processing queues
-            for media_type in ['music', 'movies', 'tv']:
-                processing_path = Path(f'/hot/processing/{media_type}')
-                if processing_path.exists():
-                    download_queue_size.labels(client='arr', status=f'processing_{media_type}').set(
-                        len(list(processing_path.glob('**/*')))
-                    )
-                    
-                manual_path = Path(f'/hot/manual/{media_type}')
-                if manual_path.exists():
-                    download_queue_size.labels(client='arr', status=f'manual_{media_type}').set(
-                        len(list(manual_path.glob('**/*')))
-                    )
-                    
-                quarantine_path = Path(f'/hot/quarantine/{media_type}')
-                if quarantine_path.exists():
-                    download_queue_size.labels(client='arr', status=f'quarantine_{media_type}').set(
-                        len(list(quarantine_path.glob('**/*')))
-                    )
+            queues = [queue for queue in (queues or self.queue_paths()) if os.path.isdir(queue[3])]
+            
+            # Scan every queue concurrently; each scan is a single streaming pass
+            results = self.queue_executor.map(
+                lambda queue: scan_queue(queue[3], self.queue_max_depth), queues
+            )
+            
+            now = time.time()
+            for (node, client, status, _), stats in zip(queues, results):
+                download_queue_size.labels(node=node, client=client, status=status).set(stats.entries)
+                download_queue_bytes.labels(node=node, client=client, status=status).set(stats.bytes)
+                download_queue_oldest_age.labels(node=node, client=client, status=status).set(stats.oldest_age(now))
+            return True
                     
         except Exception as e:
             logger.error(f"Error counting download queues: {e}")
+            return False
             
+    def health_url(self, service_name, base_url):
+        """Return the health check endpoint for a service"""
+        # Different health check endpoints for different services
+        if service_name in ['sonarr', 'radarr', 'lidarr']:
+            return f"{base_url}/api/v3/system/status"
+        elif service_name == 'prowlarr':
+            return f"{base_url}/api/v1/system/status"
+        elif service_name == 'jellyfin':
+            return f"{base_url}/health"
+        elif service_name == 'navidrome':
+            return f"{base_url}/ping"
+        elif service_name == 'frigate':
+            return f"{base_url}/api/version"
+        elif service_name == 'home-assistant':
+            return f"{base_url}/api/"
+        return base_url
+        
     def check_service_health(self):
-        """Check health of all services"""
-        for service_name, base_url in self.services.items():
-            try:
-                start_time = time.time()
-                
-                # Different health check endpoints for different services
-                if service_name in ['sonarr', 'radarr', 'lidarr']:
-                    health_url = f"{base_url}/api/v3/system/status"
-                elif service_name == 'prowlarr':
-                    health_url = f"{base_url}/api/v1/system/status"
-                elif service_name == 'jellyfin':
-                    health_url = f"{base_url}/health"
-                elif service_name == 'navidrome':
-                    health_url = f"{base_url}/ping"
-                elif service_name == 'frigate':
-                    health_url = f"{base_url}/api/version"
-                elif service_name == 'home-assistant':
-                    health_url = f"{base_url}/api/"
-                else:
-                    health_url = base_url
-                    
-                response = requests.get(health_url, timeout=5)
-                response_time = time.time() - start_time
-                
-                if response.status_code == 200:
-                    service_up.labels(service=service_name).set(1)
-                    service_response_time.labels(service=service_name).set(response_time)
-                else:
-                    service_up.labels(service=service_name).set(0)
-                    
-            except Exception as e:
-                logger.warning(f"Service {service_name} health check failed: {e}")
-                service_up.labels(service=service_name).set(0)
-                service_response_time.labels(service=service_name).set(0)
+        """Check health of all services in one concurrent sweep"""
+        try:
+            asyncio.run(self.health_engine.run_once())
+            return True
+        except Exception as e:
+            logger.error(f"Error checking service health: {e}")
+            return False
                 
     def analyze_media_imports(self):
         """Analyze media import patterns and rates"""
         try:
-            # Check recent imports by looking at file modification times
-            for media_type in ['music', 'movies', 'tv']:
-                media_path = Path(f'/media/{media_type}')
-                if not media_path.exists():
-                    continue
-                    
-                # Count files modified in last hour
-                one_hour_ago = datetime.now() - timedelta(hours=1)
-                recent_imports = 0
+            # The index is populated by the first reconcile; until then we know nothing
+            if not self.media_index.ready:
+                logger.debug("Media index not ready yet, skipping import analysis")
+                return True
                 
-                for file_path in media_path.rglob('*'):
-                    if file_path.is_file():
-                        mod_time = datetime.fromtimestamp(file_path.stat().st_mtime)
-                        if mod_time > one_hour_ago:
-                            recent_imports += 1
-                            
+            # Count files modified in last hour, straight from the index
+            one_hour_ago = (datetime.now() - timedelta(hours=1)).timestamp()
+            
+            for media_type in self.media_index.roots:
+                recent_imports = self.media_index.count_modified_since(media_type, one_hour_ago)
                 media_import_rate.labels(type=media_type).set(recent_imports)
                 logger.debug(f"Recent {media_type} imports: {recent_imports}")
+            return True
                 
         except Exception as e:
             logger.error(f"Error analyzing media imports: {e}")
+            return False
             
     def check_jellyfin_activity(self):
         """Check Jellyfin transcoding activity"""
         try:
-            # Try to get session info from Jellyfin API
-            sessions_url = f"{self.services['jellyfin']}/Sessions"
-            response = requests.get(sessions_url, timeout=5)
-            
-            if response.status_code == 200:
-                sessions = response.json()
-                transcoding_count = sum(1 for session in sessions if session.get('TranscodingInfo'))
-                active_transcoding.set(transcoding_count)
-            else:
-                active_transcoding.set(0)
-                
+            self.jellyfin.collect()
+            return True
         except Exception as e:
             logger.debug(f"Jellyfin activity check failed: {e}")
             active_transcoding.set(0)
+            return False
             
     def monitor_business_services(self):
         """Monitor business intelligence services"""
@@ -226,48 +1165,73 @@ class MediaMonitor:
                 try:
                     response = requests.get(url, timeout=3)
                     if response.status_code == 200:
-                        service_up.labels(service=f'business_{service_name}').set(1)
+                        service_up.labels(node=self.node, service=f'business_{service_name}').set(1)
                     else:
-                        service_up.labels(service=f'business_{service_name}').set(0)
+                        service_up.labels(node=self.node, service=f'business_{service_name}').set(0)
                 except:
-                    service_up.labels(service=f'business_{service_name}').set(0)
+                    service_up.labels(node=self.node, service=f'business_{service_name}').set(0)
+            return True
                     
         except Exception as e:
             logger.error(f"Error monitoring business services: {e}")
+            return False
             
-    def run_monitoring_cycle(self):
-        """Run one complete monitoring cycle"""
-        logger.info("Running monitoring cycle...")
-        
-        self.check_storage_usage()
-        self.count_download_queues()
-        self.check_service_health()
-        self.analyze_media_imports()
-        self.check_jellyfin_activity()
-        self.monitor_business_services()
-        
-        logger.info("Monitoring cycle completed")
+    def collector_specs(self):
+        """Declare every collector with its own interval, timeout and concurrency"""
+        specs = [
+            CollectorSpec('storage_usage', self.check_storage_usage, interval=15, timeout=10, ttl=0),
+            CollectorSpec('media_imports', self.analyze_media_imports, interval=60, timeout=30, ttl=0),
+            CollectorSpec('jellyfin_activity', self.check_jellyfin_activity, interval=15, timeout=10, ttl=0),
+            CollectorSpec('business_services', self.monitor_business_services, interval=60, timeout=10),
+        ]
+        # The queue tracker keeps local queue gauges live from inotify once started;
+        # remote nodes' queues are always polled
+        if not self.queue_tracker.running:
+            specs.append(CollectorSpec('download_queues', self.count_download_queues, interval=60, timeout=120))
+        elif self.queue_paths(local=False):
+            specs.append(CollectorSpec(
+                'remote_queues', lambda: self.count_download_queues(self.queue_paths(local=False)),
+                interval=60, timeout=120
+            ))
+        # The health engine probes on its own schedule once started
+        if not self.health_engine.running:
+            specs.append(CollectorSpec('service_health', self.check_service_health, interval=30, timeout=15))
+        return specs
         
 def main():
     """Main monitoring loop"""
     logger.info("Starting Media Pipeline Monitor")
     
-    # Start Prometheus metrics server
-    start_http_server(8888)
-    logger.info("Prometheus metrics server started on port 8888")
+    # push: collectors run on their own schedule; pull: collectors run when scraped
+    mode = os.getenv('MONITOR_MODE', 'push')
     
     monitor = MediaMonitor()
+    monitor.media_index.start()
+    monitor.health_engine.start()
+    if TreeWatcher.available():
+        monitor.queue_tracker.start()
     
-    while True:
+    if mode == 'pull':
+        registry = CollectorRegistry()
+        registry.register(ScrapeCollector(monitor.collector_specs()))
+        start_http_server(8888, registry=registry)
+        logger.info("Prometheus metrics server started on port 8888 (collecting on scrape)")
         try:
-            monitor.run_monitoring_cycle()
-            time.sleep(30)  # Run every 30 seconds
+            while True:
+                time.sleep(3600)
         except KeyboardInterrupt:
             logger.info("Shutting down monitor...")
-            break
-        except Exception as e:
-            logger.error(f"Monitoring cycle failed: {e}")
-            time.sleep(60)  # Wait longer on error
+        return
+    
+    # Start Prometheus metrics server
+    start_http_server(8888)
+    logger.info("Prometheus metrics server started on port 8888")
+    
+    scheduler = CollectorScheduler(monitor.collector_specs())
+    try:
+        scheduler.run_forever()
+    except KeyboardInterrupt:
+        logger.info("Shutting down monitor...")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
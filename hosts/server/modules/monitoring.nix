@@ -174,7 +174,12 @@ in
         "/opt/downloads:/downloads:ro"
         "/etc/localtime:/etc/localtime:ro"
       ];
-      cmd = [ "sh" "-c" "cd /app && pip install psutil prometheus_client requests && python media_monitor.py" ];
+      environment = {
+        # "pull" computes metrics when Prometheus scrapes instead of on a timer
+        MONITOR_MODE = "push";
+        # Set JELLYFIN_API_KEY (e.g. via environmentFiles) to see every user's transcodes
+      };
+      cmd = [ "sh" "-c" "cd /app && pip install psutil prometheus_client requests httpx inotify_simple && python media_monitor.py" ];
     };
 
     # Private ntfy notification service
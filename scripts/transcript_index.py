@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Transcript Search Index
+HWC NixOS Homeserver - SQLite FTS5 index over the transcripts vault
+
+yt_transcript.py adds each transcript as it is written; this CLI searches the
+index and can (re)build it from the markdown already under TRANSCRIPTS_ROOT.
+
+Usage:
+    transcript_index.py search "nix flakes" --limit 10
+    transcript_index.py update      # index new/changed files, drop deleted ones
+    transcript_index.py rebuild     # start from scratch
+"""
+
+import argparse
+import os
+import re
+import sqlite3
+import sys
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlencode, urlparse, parse_qsl, urlunparse
+
+DEFAULT_ROOT = "/home/eric/01-documents/01-vaults/04-transcripts"
+
+HEADER_FIELD_RE = re.compile(r"^- \*\*(Channel|Upload Date|URL)\*\*: (.*)$")
+SECTION_RE = re.compile(r"^### (\d+) ▸ (?:(\d+):)?(\d+):(\d+)$")
+
+# Section rowids are (transcript id << SECTION_BITS) + n, so one transcript's
+# sections are a rowid range: replacing or removing them never scans the FTS table
+SECTION_BITS = 20
+SCHEMA_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transcripts (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    video_id TEXT,
+    title TEXT,
+    channel TEXT,
+    upload_date TEXT,
+    webpage_url TEXT,
+    mtime REAL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS sections USING fts5(
+    text,
+    chunk UNINDEXED,
+    start UNINDEXED,
+    tokenize = 'porter unicode61'
+);
+"""
+
+
+def default_db_path() -> Path:
+    root = Path(os.getenv("TRANSCRIPTS_ROOT", DEFAULT_ROOT))
+    return Path(os.getenv("TRANSCRIPT_INDEX_DB", str(root / ".index" / "transcripts.db")))
+
+
+def deep_link(webpage_url: str, seconds: float) -> str:
+    """Video URL that starts playback at the given offset"""
+    if not webpage_url:
+        return ""
+    parsed = urlparse(webpage_url)
+    query = [(k, v) for k, v in parse_qsl(parsed.query) if k != "t"]
+    query.append(("t", f"{int(seconds)}s"))
+    return urlunparse(parsed._replace(query=urlencode(query)))
+
+
+def parse_markdown(text: str) -> Tuple[Dict, List[Tuple[int, float, str]]]:
+    """Split a yt_transcript markdown file into header metadata and (chunk, start, text) sections"""
+    meta: Dict[str, str] = {}
+    sections: List[Tuple[int, float, str]] = []
+    current: Optional[Tuple[int, float]] = None
+    body: List[str] = []
+
+    def flush():
+        if current and body:
+            sections.append((current[0], current[1], " ".join(body).strip()))
+
+    for line in text.splitlines():
+        if line.startswith("# ") and "title" not in meta:
+            meta["title"] = line[2:].strip()
+            continue
+        field = HEADER_FIELD_RE.match(line)
+        if field and current is None:
+            meta[{"Channel": "channel", "Upload Date": "upload_date", "URL": "webpage_url"}[field.group(1)]] = field.group(2).strip()
+            continue
+        section = SECTION_RE.match(line.strip())
+        if section:
+            flush()
+            chunk, h, m, s = section.groups()
+            current = (int(chunk), int(h or 0) * 3600 + int(m) * 60 + int(s))
+            body = []
+        elif current and line.strip():
+            body.append(line.strip())
+    flush()
+
+    video_id = ""
+    url = meta.get("webpage_url", "")
+    if url:
+        video_id = dict(parse_qsl(urlparse(url).query)).get("v", "")
+    meta["id"] = video_id
+    return meta, sections
+
+
+class TranscriptIndex:
+    """SQLite FTS5 index of transcript sections keyed by markdown file path"""
+
+    def __init__(self, db_path: Optional[Path] = None):
+        self.db_path = Path(db_path) if db_path else default_db_path()
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        if self.conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            # Older layout keyed sections by path; the index is derived data, so start over
+            self.conn.executescript("DROP TABLE IF EXISTS sections; DROP TABLE IF EXISTS transcripts;")
+            self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def _delete_sections(self, transcript_id: int) -> None:
+        first = transcript_id << SECTION_BITS
+        self.conn.execute("DELETE FROM sections WHERE rowid BETWEEN ? AND ?",
+                          (first, first + (1 << SECTION_BITS) - 1))
+
+    def add(self, path: Path, meta: Dict, sections: Iterable[Tuple[int, float, str]]) -> None:
+        """Replace the indexed sections of one transcript file"""
+        key = str(path)
+        try:
+            mtime = path.stat().st_mtime
+        except OSError:
+            mtime = 0.0
+        values = (meta.get("id", ""), meta.get("title", ""), meta.get("channel", ""),
+                  meta.get("upload_date", ""), meta.get("webpage_url", ""), mtime)
+        with self.conn:
+            row = self.conn.execute("SELECT id FROM transcripts WHERE path = ?", (key,)).fetchone()
+            if row:
+                transcript_id = row[0]
+                self._delete_sections(transcript_id)
+                self.conn.execute(
+                    "UPDATE transcripts SET video_id = ?, title = ?, channel = ?, upload_date = ?, "
+                    "webpage_url = ?, mtime = ? WHERE id = ?",
+                    values + (transcript_id,),
+                )
+            else:
+                transcript_id = self.conn.execute(
+                    "INSERT INTO transcripts (path, video_id, title, channel, upload_date, webpage_url, mtime) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (key,) + values,
+                ).lastrowid
+            first = transcript_id << SECTION_BITS
+            rows = [(chunk, start, text) for chunk, start, text in sections if text][:1 << SECTION_BITS]
+            self.conn.executemany(
+                "INSERT INTO sections (rowid, text, chunk, start) VALUES (?, ?, ?, ?)",
+                ((first + n, text, chunk, start) for n, (chunk, start, text) in enumerate(rows)),
+            )
+
+    def remove(self, path: str) -> None:
+        with self.conn:
+            row = self.conn.execute("SELECT id FROM transcripts WHERE path = ?", (path,)).fetchone()
+            if row:
+                self._delete_sections(row[0])
+                self.conn.execute("DELETE FROM transcripts WHERE id = ?", (row[0],))
+
+    def add_file(self, path: Path) -> None:
+        """Index a transcript from its markdown on disk"""
+        meta, sections = parse_markdown(path.read_text(encoding="utf-8", errors="ignore"))
+        self.add(path, meta, sections)
+
+    def update(self, root: Path) -> Tuple[int, int]:
+        """Index new or modified transcripts under root and forget deleted ones"""
+        known = {row["path"]: row["mtime"] for row in self.conn.execute("SELECT path, mtime FROM transcripts")}
+        seen = set()
+        indexed = 0
+        for path in root.rglob("*.md"):
+            if path.name == "00-playlist-overview.md" or any(part.startswith(".") for part in path.relative_to(root).parts):
+                continue
+            key = str(path)
+            seen.add(key)
+            try:
+                if known.get(key) == path.stat().st_mtime:
+                    continue
+                self.add_file(path)
+                indexed += 1
+            except OSError as e:
+                print(f"⚠ Could not index {path}: {e}")
+
+        # Only forget files under this root; --output-dir transcripts may live elsewhere
+        prefix = str(root).rstrip(os.sep) + os.sep
+        removed = [key for key in known if key not in seen and key.startswith(prefix)]
+        for key in removed:
+            self.remove(key)
+        return indexed, len(removed)
+
+    def rebuild(self, root: Path) -> Tuple[int, int]:
+        """Drop everything and index root from scratch"""
+        with self.conn:
+            self.conn.execute("DELETE FROM sections")
+            self.conn.execute("DELETE FROM transcripts")
+        return self.update(root)
+
+    def search(self, query: str, limit: int = 20) -> List[Dict]:
+        """Best matching sections, with a snippet and a deep link to the section start"""
+        try:
+            rows = self.conn.execute(
+                "SELECT s.chunk, s.start, snippet(sections, 0, '**', '**', ' … ', 16) AS snippet, "
+                "t.path, t.video_id, t.title, t.channel, t.upload_date, t.webpage_url "
+                f"FROM sections s JOIN transcripts t ON t.id = (s.rowid >> {SECTION_BITS}) "
+                "WHERE sections MATCH ? ORDER BY bm25(sections) LIMIT ?",
+                (query, limit),
+            ).fetchall()
+        except sqlite3.OperationalError:
+            # Not valid FTS5 syntax: search for the words as a phrase instead
+            return self.search('"' + query.replace('"', '""') + '"', limit) if not query.startswith('"') else []
+
+        return [
+            {
+                "title": row["title"],
+                "channel": row["channel"],
+                "upload_date": row["upload_date"],
+                "video_id": row["video_id"],
+                "chunk": row["chunk"],
+                "start": row["start"],
+                "url": deep_link(row["webpage_url"], row["start"]),
+                "snippet": row["snippet"],
+                "path": row["path"],
+            }
+            for row in rows
+        ]
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="transcript-index", description="Search the transcripts vault")
+    parser.add_argument("--db", default=None, help="Index database (default: $TRANSCRIPT_INDEX_DB)")
+    parser.add_argument("--root", default=os.getenv("TRANSCRIPTS_ROOT", DEFAULT_ROOT), help="Transcripts root")
+    sub = parser.add_subparsers(dest="command", required=True)
+    search = sub.add_parser("search", help="Full-text search over transcript sections")
+    search.add_argument("query")
+    search.add_argument("--limit", type=int, default=20)
+    sub.add_parser("update", help="Index new/changed transcripts and drop deleted ones")
+    sub.add_parser("rebuild", help="Rebuild the index from scratch")
+    args = parser.parse_args()
+
+    index = TranscriptIndex(Path(args.db) if args.db else None)
+    try:
+        if args.command == "search":
+            results = index.search(args.query, args.limit)
+            if not results:
+                print("No matches")
+            for result in results:
+                print(f"{result['title']} [{result['channel']}]")
+                print(f"  {result['url']}")
+                print(f"  {result['snippet']}")
+        else:
+            root = Path(args.root)
+            indexed, removed = index.rebuild(root) if args.command == "rebuild" else index.update(root)
+            print(f"✅ Indexed {indexed} transcripts, removed {removed} from {index.db_path}")
+    finally:
+        index.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,20 +5,27 @@ HWC NixOS Homeserver - REST API for transcript extraction with mobile integratio
 """
 
 import asyncio
+import base64
+import hashlib
 import json
 import os
 import shutil
+import sqlite3
+import tempfile
+import threading
 import time
 import uuid
 import zipfile
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional, Set
+from typing import BinaryIO, Dict, List, Optional, Set, Tuple
 from urllib.parse import urlparse
 
 try:
-    from fastapi import FastAPI, Request, HTTPException, BackgroundTasks, Response
+    from fastapi import FastAPI, Request, HTTPException, Response
     from fastapi.responses import StreamingResponse, JSONResponse
     from pydantic import BaseModel, Field, AnyHttpUrl
     import httpx
@@ -28,10 +35,17 @@ except ImportError as e:
     print("Install with: pip install fastapi uvicorn pydantic httpx")
     exit(1)
 
+# Optional: Prometheus metrics at /metrics
+try:
+    from prometheus_client import Gauge, Histogram, generate_latest, CONTENT_TYPE_LATEST
+except ImportError:
+    Gauge = Histogram = None
+
 # Import our CLI transcript extractor
 import sys
 sys.path.append('/etc/nixos/scripts')
 from yt_transcript import TranscriptExtractor, Config as TranscriptConfig
+from transcript_index import TranscriptIndex
 
 
 class Config:
@@ -48,6 +62,16 @@ class Config:
         self.retention_days = int(os.getenv("RETENTION_DAYS", "90"))
         self.webhooks_enabled = os.getenv("WEBHOOKS", "0") == "1"
         self.timezone = os.getenv("TZ", "America/Denver")
+        self.job_workers = int(os.getenv("JOB_WORKERS", "2"))
+        self.io_workers = int(os.getenv("IO_WORKERS", "4"))
+        # Finished result zips kept for resumed (Range) downloads; ZIP_CACHE=0 streams only
+        self.zip_cache_enabled = os.getenv("ZIP_CACHE", "1") == "1"
+        self.zip_cache_dir = Path(os.getenv("ZIP_CACHE_DIR", str(self.hot_root / "cache" / "transcript-zips")))
+        self.zip_cache_max_bytes = int(float(os.getenv("ZIP_CACHE_MAX_MB", "1024")) * 1024 * 1024)
+        self.zip_cache_max_age = float(os.getenv("ZIP_CACHE_MAX_AGE_HOURS", "72")) * 3600
+        self.jobs_db = Path(os.getenv("JOB_DB", str(self.transcripts_root / "api-requests" / "jobs.db")))
+        self.queue_db = Path(os.getenv("JOB_QUEUE_DB", str(self.transcripts_root / "api-requests" / "queue.db")))
+        self.index_db = Path(os.getenv("TRANSCRIPT_INDEX_DB", str(self.transcripts_root / ".index" / "transcripts.db")))
 
 
 class SubmitRequest(BaseModel):
@@ -98,14 +122,65 @@ class RateLimiter:
 
 
 class JobStore:
-    """Simple file-based job store"""
-    def __init__(self, root: Path):
+    """Job store: status.json per request directory, indexed in SQLite (WAL) for listing.
+    
+    Reads go through an in-memory cache; the index makes /api/list a single indexed
+    query however many past jobs there are. Existing status.json files are imported
+    into the index the first time it is created.
+    """
+    def __init__(self, root: Path, db_path: Optional[Path] = None):
         self.root = root
         self.root.mkdir(parents=True, exist_ok=True)
         self.by_id: Dict[str, JobStatus] = {}
-        self.lock = asyncio.Lock()
+        self.lock = threading.Lock()
+        
+        db_path = db_path or self.root / "api-requests" / "jobs.db"
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(db_path), timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        fresh = not self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'jobs'"
+        ).fetchone()
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                request_id TEXT PRIMARY KEY,
+                api_key TEXT NOT NULL DEFAULT '',
+                kind TEXT NOT NULL,
+                url TEXT NOT NULL,
+                status TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL,
+                data TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS jobs_created ON jobs (created_at, request_id);
+            CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at);
+            CREATE INDEX IF NOT EXISTS jobs_api_key ON jobs (api_key, created_at);
+        """)
+        if fresh:
+            self._import_status_files()
+    
+    def _import_status_files(self) -> None:
+        """Backfill the index from status.json files written before it existed"""
+        requests_dir = self.root / "api-requests"
+        for status_file in requests_dir.glob("*/status.json"):
+            try:
+                self._index(JobStatus.model_validate(json.loads(status_file.read_text())))
+            except Exception:
+                continue
+    
+    def _index(self, job: JobStatus, api_key: Optional[str] = None) -> None:
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO jobs (request_id, api_key, kind, url, status, created_at, updated_at, data) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(request_id) DO UPDATE SET status = excluded.status, "
+                "updated_at = excluded.updated_at, data = excluded.data",
+                (job.request_id, api_key or "", job.kind, job.url, job.status,
+                 job.created_at, job.updated_at, json.dumps(job.model_dump())),
+            )
     
-    def new_request(self, kind: str, url: str) -> JobStatus:
+    def new_request(self, kind: str, url: str, api_key: str = "") -> JobStatus:
         """Create new job request"""
         request_id = uuid.uuid4().hex[:12]
         request_dir = self.root / "api-requests" / request_id
@@ -123,82 +198,487 @@ class JobStore:
         )
         
         self._persist(status)
+        self._index(status, api_key)
         self.by_id[request_id] = status
         return status
     
     def load(self, request_id: str) -> Optional[JobStatus]:
-        """Load job status from disk"""
-        status_file = self.root / "api-requests" / request_id / "status.json"
-        if status_file.exists():
+        """Load job status (memory, then index, then status.json on disk)"""
+        if request_id in self.by_id:
+            return self.by_id[request_id]
+        
+        with self.lock:
+            row = self.conn.execute("SELECT data FROM jobs WHERE request_id = ?", (request_id,)).fetchone()
+        try:
+            if row:
+                status = JobStatus.model_validate(json.loads(row[0]))
+            else:
+                status_file = self.root / "api-requests" / request_id / "status.json"
+                if not status_file.exists():
+                    return None
+                status = JobStatus.model_validate(json.loads(status_file.read_text()))
+                self._index(status)
+        except Exception:
+            return None
+        
+        self.by_id[request_id] = status
+        return status
+    
+    def list_recent(self, limit: int = 50, cursor: Optional[str] = None, status: Optional[str] = None,
+                    api_key: Optional[str] = None) -> Tuple[List[JobStatus], Optional[str]]:
+        """Newest jobs first, one page at a time; returns (jobs, cursor for the next page)"""
+        clauses, params = [], []
+        if cursor:
             try:
-                data = json.loads(status_file.read_text())
-                return JobStatus.model_validate(data)
+                created_at, request_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
             except Exception:
-                return None
-        return None
-    
-    def list_recent(self, limit: int = 50) -> List[JobStatus]:
-        """List recent jobs"""
-        requests_dir = self.root / "api-requests"
-        if not requests_dir.exists():
-            return []
+                raise ValueError("invalid cursor")
+            clauses.append("(created_at, request_id) < (?, ?)")
+            params += [created_at, request_id]
+        if status:
+            clauses.append("status = ?")
+            params.append(status)
+        if api_key is not None:
+            clauses.append("api_key = ?")
+            params.append(api_key)
         
-        jobs = []
-        for job_dir in sorted(requests_dir.iterdir(), key=lambda x: x.stat().st_mtime, reverse=True):
-            if job_dir.is_dir():
-                status = self.load(job_dir.name)
-                if status:
-                    jobs.append(status)
-                    if len(jobs) >= limit:
-                        break
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self.lock:
+            rows = self.conn.execute(
+                f"SELECT request_id, created_at, data FROM jobs {where} "
+                "ORDER BY created_at DESC, request_id DESC LIMIT ?",
+                params + [limit + 1],
+            ).fetchall()
         
-        return jobs
+        jobs = []
+        for request_id, _, data in rows[:limit]:
+            # Prefer the live in-memory object for jobs that are still changing
+            jobs.append(self.by_id.get(request_id) or JobStatus.model_validate(json.loads(data)))
+        next_cursor = None
+        if len(rows) > limit:
+            last_id, last_created, _ = rows[limit - 1]
+            next_cursor = base64.urlsafe_b64encode(f"{last_created}|{last_id}".encode()).decode()
+        return jobs, next_cursor
     
-    def update(self, status: JobStatus, **kwargs) -> JobStatus:
+    def update(self, job: JobStatus, **kwargs) -> JobStatus:
         """Update job status"""
         for key, value in kwargs.items():
-            setattr(status, key, value)
-        status.updated_at = datetime.now().isoformat()
-        self._persist(status)
-        return status
+            setattr(job, key, value)
+        job.updated_at = datetime.now().isoformat()
+        self._persist(job)
+        self._index(job)
+        self.by_id[job.request_id] = job
+        return job
     
     def _persist(self, status: JobStatus) -> None:
         """Save job status to disk"""
         status_file = Path(status.out_dir) / "status.json"
         status_file.write_text(json.dumps(status.model_dump(), indent=2))
     
-    def zip_result(self, request_id: str) -> Optional[Path]:
-        """Create zip file of job results"""
+    def result_entries(self, request_id: str) -> Optional[List[Tuple[Path, str]]]:
+        """(file, name in zip) pairs for a completed job's results, or None if not available"""
         status = self.load(request_id)
         if not status or status.status != "complete":
             return None
         
-        out_dir = Path(status.out_dir)
-        zip_path = out_dir / "result.zip"
-        
-        if zip_path.exists():
-            return zip_path
-        
-        # Create zip file
-        with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zf:
-            for file_path_str in status.files:
-                file_path = Path(file_path_str)
-                if file_path.exists() and file_path.is_file():
-                    # Add file to zip with relative path
-                    arcname = file_path.name
-                    zf.write(file_path, arcname)
-        
-        return zip_path if zip_path.exists() else None
+        entries: List[Tuple[Path, str]] = []
+        names: Set[str] = set()
+        for file_path_str in status.files:
+            file_path = Path(file_path_str)
+            if not file_path.is_file():
+                continue
+            # Add file to zip by name, disambiguating repeats
+            arcname = file_path.name
+            counter = 1
+            while arcname in names:
+                counter += 1
+                arcname = f"{file_path.stem}-{counter}{file_path.suffix}"
+            names.add(arcname)
+            entries.append((file_path, arcname))
+        return entries or None
+
+
+class ZipStreamBuffer:
+    """Write-only, non-seekable sink for ZipFile; written bytes are drained as they accumulate"""
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.position = 0
+    
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+    
+    def tell(self) -> int:
+        # No seek(): ZipFile then writes data descriptors instead of patching headers
+        return self.position
+    
+    def flush(self) -> None:
+        pass
+    
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def zip_etag(entries: List[Tuple[Path, str]]) -> str:
+    """Strong ETag for the zip of these files: the output is deterministic for the same names, sizes and mtimes"""
+    digest = hashlib.sha1()
+    for path, arcname in entries:
+        stat = path.stat()
+        digest.update(f"{arcname}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode())
+    return digest.hexdigest()[:20]
+
+
+def iter_zip(entries: List[Tuple[Path, str]], tee: Optional[BinaryIO] = None, chunk_size: int = 256 * 1024):
+    """Yield a deflated zip of the entries piece by piece, optionally copying it into tee"""
+    sink = ZipStreamBuffer()
+    
+    def drained():
+        data = sink.drain()
+        if data and tee:
+            tee.write(data)
+        return data
+    
+    with zipfile.ZipFile(sink, "w", zipfile.ZIP_DEFLATED) as zf:
+        for path, arcname in entries:
+            info = zipfile.ZipInfo.from_file(path, arcname)
+            info.compress_type = zipfile.ZIP_DEFLATED
+            with open(path, "rb") as src, zf.open(info, "w") as dest:
+                while chunk := src.read(chunk_size):
+                    dest.write(chunk)
+                    if data := drained():
+                        yield data
+            if data := drained():
+                yield data
+    if data := drained():
+        yield data
+
+
+class ZipCache:
+    """Completed result zips kept for Range/ETag requests, evicted by age and total size"""
+    def __init__(self, root: Path, max_bytes: int, max_age: float):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.root.mkdir(parents=True, exist_ok=True)
+    
+    def path(self, request_id: str, etag: str) -> Path:
+        return self.root / f"{request_id}-{etag}.zip"
+    
+    def get(self, request_id: str, etag: str) -> Optional[Path]:
+        path = self.path(request_id, etag)
+        if not path.is_file():
+            return None
+        os.utime(path)  # Mark as recently used
+        return path
+    
+    def open_temp(self) -> BinaryIO:
+        return tempfile.NamedTemporaryFile(dir=self.root, prefix=".partial-", suffix=".zip", delete=False)
+    
+    def commit(self, tmp: BinaryIO, request_id: str, etag: str) -> Path:
+        tmp.close()
+        path = self.path(request_id, etag)
+        Path(tmp.name).replace(path)
+        self.evict()
+        return path
+    
+    def discard(self, tmp: BinaryIO) -> None:
+        tmp.close()
+        Path(tmp.name).unlink(missing_ok=True)
+    
+    def build(self, request_id: str, etag: str, entries: List[Tuple[Path, str]]) -> Path:
+        """Write the whole zip into the cache (blocking)"""
+        tmp = self.open_temp()
+        try:
+            for _ in iter_zip(entries, tee=tmp):
+                pass
+        except BaseException:
+            self.discard(tmp)
+            raise
+        return self.commit(tmp, request_id, etag)
+    
+    def evict(self) -> None:
+        """Drop zips past max_age, then least recently used ones until under max_bytes"""
+        now = time.time()
+        files = []
+        for path in self.root.glob("*.zip"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            # Stale partials from interrupted streams count as old too
+            if now - stat.st_mtime > self.max_age:
+                path.unlink(missing_ok=True)
+                continue
+            if not path.name.startswith(".partial-"):
+                files.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Single 'bytes=' range to inclusive (start, end); None to serve the whole file.
+    
+    Raises ValueError for a range that cannot be satisfied.
+    """
+    if not header.startswith("bytes=") or "," in header:
+        return None
+    start_str, _, end_str = header[6:].strip().partition("-")
+    try:
+        if not start_str:
+            length = int(end_str)
+            if length <= 0:
+                raise ValueError("empty suffix range")
+            return max(0, size - length), size - 1
+        start = int(start_str)
+        end = min(int(end_str), size - 1) if end_str else size - 1
+    except ValueError:
+        raise ValueError(f"bad range: {header}")
+    if start >= size or start > end:
+        raise ValueError(f"unsatisfiable range: {header}")
+    return start, end
+
+
+class JobQueue:
+    """SQLite-backed queue of pending/running jobs, drained by a fixed pool of async workers.
+    
+    Rows live only while a job is queued or running; results stay in JobStore.
+    Running rows left behind by a crash or restart are requeued on startup.
+    The methods block on SQLite, so callers on the event loop go through run_io.
+    """
+    def __init__(self, db_path: Path, workers: int):
+        self.db_path = db_path
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.workers = max(1, workers)
+        self.conn = sqlite3.connect(str(db_path), timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS queue (
+                request_id TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                format TEXT NOT NULL,
+                languages TEXT NOT NULL,
+                webhook_url TEXT,
+                state TEXT NOT NULL DEFAULT 'queued',
+                enqueued_at REAL NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS queue_state ON queue (state, enqueued_at)")
+        self.conn.commit()
+        self.lock = threading.Lock()
+        self.wakeup = asyncio.Event()
+        self.tasks: List[asyncio.Task] = []
+    
+    def recover(self) -> List[str]:
+        """Requeue jobs that were running when the service stopped"""
+        with self.lock, self.conn:
+            rows = self.conn.execute("SELECT request_id FROM queue WHERE state = 'running'").fetchall()
+            self.conn.execute("UPDATE queue SET state = 'queued' WHERE state = 'running'")
+        return [row[0] for row in rows]
+    
+    def find_active(self, url: str, format_mode: str) -> Optional[str]:
+        """request_id of an identical job that is still queued or running"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT request_id FROM queue WHERE url = ? AND format = ? ORDER BY enqueued_at LIMIT 1",
+                (url, format_mode),
+            ).fetchone()
+        return row[0] if row else None
+    
+    def put(self, request_id: str, url: str, format_mode: str, languages: List[str], webhook_url: Optional[str]) -> None:
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO queue (request_id, url, format, languages, webhook_url, enqueued_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (request_id, url, format_mode, json.dumps(languages), webhook_url, time.time()),
+            )
+    
+    def claim(self) -> Optional[Dict]:
+        """Mark the oldest queued job as running and return it"""
+        with self.lock, self.conn:
+            row = self.conn.execute(
+                "SELECT request_id, url, format, languages, webhook_url FROM queue "
+                "WHERE state = 'queued' ORDER BY enqueued_at LIMIT 1"
+            ).fetchone()
+            if not row:
+                return None
+            self.conn.execute("UPDATE queue SET state = 'running' WHERE request_id = ?", (row[0],))
+        return {"request_id": row[0], "url": row[1], "format": row[2],
+                "languages": json.loads(row[3]), "webhook_url": row[4]}
+    
+    def done(self, request_id: str) -> None:
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM queue WHERE request_id = ?", (request_id,))
+    
+    def depth(self) -> Dict[str, int]:
+        with self.lock:
+            counts = dict(self.conn.execute("SELECT state, COUNT(*) FROM queue GROUP BY state").fetchall())
+        return {"queued": counts.get("queued", 0), "running": counts.get("running", 0)}
+    
+    async def worker(self, handler) -> None:
+        """Claim and run jobs until cancelled"""
+        while True:
+            job = await run_io(self.claim)
+            if not job:
+                self.wakeup.clear()
+                await self.wakeup.wait()
+                continue
+            # Others may be waiting and there could be more work
+            self.wakeup.set()
+            try:
+                await handler(job["request_id"], job["url"], job["format"], job["languages"], job["webhook_url"])
+            except asyncio.CancelledError:
+                # Shutting down mid-job: leave the row 'running' so recover() requeues it
+                raise
+            except Exception as e:
+                print(f"❌ Job {job['request_id']} failed: {e}")
+            await run_io(self.done, job["request_id"])
+    
+    async def enqueue(self, request_id: str, url: str, format_mode: str, languages: List[str],
+                      webhook_url: Optional[str]) -> None:
+        """put() off the event loop, then wake a worker"""
+        await run_io(self.put, request_id, url, format_mode, languages, webhook_url)
+        self.wakeup.set()
+    
+    def start(self, handler) -> None:
+        self.tasks = [asyncio.create_task(self.worker(handler)) for _ in range(self.workers)]
+    
+    async def stop(self) -> None:
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+
+class ProgressHub:
+    """Fans job progress events out to SSE subscribers on the API event loop.
+    
+    Jobs run on other threads, so they publish through publish_threadsafe(); the
+    latest event per job is kept so late subscribers start from the current state.
+    """
+    def __init__(self):
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.subscribers: Dict[str, Set[asyncio.Queue]] = defaultdict(set)
+        self.latest: Dict[str, Dict] = {}
+    
+    def publish(self, request_id: str, event: Dict) -> None:
+        if event.get("event") == "status" and event.get("status") in ("complete", "error"):
+            self.latest.pop(request_id, None)
+        else:
+            self.latest[request_id] = event
+        for subscriber in self.subscribers.get(request_id, ()):
+            subscriber.put_nowait(event)
+    
+    def publish_threadsafe(self, request_id: str, event: Dict) -> None:
+        if self.loop and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self.publish, request_id, event)
+    
+    def subscribe(self, request_id: str) -> asyncio.Queue:
+        subscriber: asyncio.Queue = asyncio.Queue()
+        self.subscribers[request_id].add(subscriber)
+        return subscriber
+    
+    def unsubscribe(self, request_id: str, subscriber: asyncio.Queue) -> None:
+        self.subscribers[request_id].discard(subscriber)
+        if not self.subscribers[request_id]:
+            del self.subscribers[request_id]
+
+
+class LoopLagMonitor:
+    """Measures how late the event loop wakes up from a fixed sleep.
+    
+    Anything blocking the loop (sync I/O in a handler, CPU work) shows up as lag,
+    so this is the number that proves the API stays responsive while jobs run.
+    """
+    def __init__(self, interval: float = 0.25):
+        self.interval = interval
+        self.last = 0.0
+        self.peak = 0.0
+        self.histogram = Histogram(
+            "transcript_api_event_loop_lag_seconds", "Event loop wake-up delay",
+            buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+        ) if Histogram else None
+    
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - start - self.interval)
+            self.last = lag
+            self.peak = max(self.peak, lag)
+            if self.histogram:
+                self.histogram.observe(lag)
 
 
 # Initialize global objects
 cfg = Config()
-store = JobStore(cfg.transcripts_root)
+store = JobStore(cfg.transcripts_root, cfg.jobs_db)
 limiter = RateLimiter(cfg.rate_limit_per_hour)
+queue = JobQueue(cfg.queue_db, cfg.job_workers)
+# Only used for URL validation; jobs get their own extractor
+url_checker = TranscriptExtractor(TranscriptConfig())
+loop_lag = LoopLagMonitor()
+hub = ProgressHub()
+# (url, format) of submits between their duplicate check and queue.put()
+submitting: Dict[Tuple[str, str], asyncio.Future] = {}
+zip_cache: Optional[ZipCache] = None
+if cfg.zip_cache_enabled:
+    try:
+        zip_cache = ZipCache(cfg.zip_cache_dir, cfg.zip_cache_max_bytes, cfg.zip_cache_max_age)
+    except OSError as e:
+        print(f"⚠ Zip cache disabled ({cfg.zip_cache_dir}): {e}")
+
+# Dedicated pools: jobs (one thread + event loop per running job) and short blocking
+# I/O from request handlers (status files, zips, disk usage, index queries)
+job_pool = ThreadPoolExecutor(max_workers=max(1, cfg.job_workers), thread_name_prefix="transcript-job")
+io_pool = ThreadPoolExecutor(max_workers=max(1, cfg.io_workers), thread_name_prefix="transcript-io")
+
+if Gauge:
+    Gauge("transcript_api_jobs_queued", "Jobs waiting in the queue").set_function(lambda: queue.depth()["queued"])
+    Gauge("transcript_api_jobs_running", "Jobs currently running").set_function(lambda: queue.depth()["running"])
+
+
+async def run_io(func, *args):
+    """Run a blocking call on the I/O pool"""
+    return await asyncio.get_running_loop().run_in_executor(io_pool, func, *args)
+
+
+async def run_job(*args) -> None:
+    """Run process_job on the job pool in its own event loop so it never blocks the API loop"""
+    await asyncio.get_running_loop().run_in_executor(job_pool, lambda: asyncio.run(process_job(*args)))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Recover interrupted jobs, then run the queue workers for the app's lifetime"""
+    def requeue_interrupted():
+        for request_id in queue.recover():
+            status = store.load(request_id)
+            if status:
+                store.update(status, status="queued", progress=0.0, message="Requeued after restart")
+    
+    await run_io(requeue_interrupted)
+    hub.loop = asyncio.get_running_loop()
+    queue.start(run_job)
+    lag_task = asyncio.create_task(loop_lag.run())
+    yield
+    lag_task.cancel()
+    await queue.stop()
+    job_pool.shutdown(wait=False, cancel_futures=True)
+    io_pool.shutdown(wait=False)
+
+
 app = FastAPI(
     title="HWC Transcript API",
     description="YouTube transcript extraction API for HWC homeserver",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 
@@ -234,43 +714,64 @@ async def process_job(request_id: str, url: str, format_mode: str, languages: Li
             return
         
         store.update(status, status="running", progress=0.1)
+        hub.publish_threadsafe(request_id, {"event": "status", **status.model_dump()})
+        
+        # Per-video progress: ETA, partial files, and a status.json that keeps up
+        started = time.monotonic()
+        partial_files: List[str] = []
+        
+        def on_progress(event: Dict) -> None:
+            if event["event"] == "video":
+                done, total = event["done"], event["total"]
+                elapsed = time.monotonic() - started
+                event["eta_seconds"] = round(elapsed / done * (total - done), 1)
+                event["progress"] = round(0.1 + 0.85 * done / total, 3)
+                if event["file"]:
+                    partial_files.append(event["file"])
+                store.update(status, progress=event["progress"], files=list(partial_files),
+                             message=f"{done}/{total} videos processed")
+            hub.publish_threadsafe(request_id, event)
         
         # Initialize transcript extractor
         transcript_config = TranscriptConfig()
-        extractor = TranscriptExtractor(transcript_config)
+        extractor = TranscriptExtractor(transcript_config, progress=on_progress)
         
-        # Determine job type and process
-        if "playlist" in url:
-            # Process playlist
-            playlist_dir, files = await extractor.process_playlist(
-                url, 
-                cfg.transcripts_root / "playlists", 
-                languages, 
-                mode=format_mode
-            )
+        try:
+            # Determine job type and process
+            if "playlist" in url:
+                # Process playlist
+                playlist_dir, files = await extractor.process_playlist(
+                    url, 
+                    cfg.transcripts_root / "playlists", 
+                    languages, 
+                    mode=format_mode
+                )
             
-            # Update status with results
-            all_files = [playlist_dir / "00-playlist-overview.md"] + files
-            store.update(
-                status,
-                status="complete",
-                progress=1.0,
-                files=[str(f) for f in all_files if f.exists()],
-                message=f"Processed {len(files)} videos"
-            )
-        else:
-            # Process single video
-            date_dir = cfg.transcripts_root / "individual" / datetime.now().strftime("%Y-%m-%d")
-            file_path = await extractor.process_video(url, date_dir, languages, mode=format_mode)
+                # Update status with results
+                all_files = [playlist_dir / "00-playlist-overview.md"] + files
+                store.update(
+                    status,
+                    status="complete",
+                    progress=1.0,
+                    files=[str(f) for f in all_files if f.exists()],
+                    message=f"Processed {len(files)} videos"
+                )
+            else:
+                # Process single video
+                date_dir = cfg.transcripts_root / "individual" / datetime.now().strftime("%Y-%m-%d")
+                file_path = await extractor.process_video(url, date_dir, languages, mode=format_mode)
             
-            # Update status with result
-            store.update(
-                status,
-                status="complete",
-                progress=1.0,
-                files=[str(file_path)],
-                message="Video processed successfully"
-            )
+                # Update status with result
+                store.update(
+                    status,
+                    status="complete",
+                    progress=1.0,
+                    files=[str(file_path)],
+                    message="Video processed successfully"
+                )
+        finally:
+            await extractor.aclose()
+        hub.publish_threadsafe(request_id, {"event": "status", **status.model_dump()})
         
         # Send webhook notification if configured
         if webhook_url and cfg.webhooks_enabled:
@@ -287,80 +788,236 @@ async def process_job(request_id: str, url: str, format_mode: str, languages: Li
         status = store.load(request_id)
         if status:
             store.update(status, status="error", message=str(e))
+            hub.publish_threadsafe(request_id, {"event": "status", **status.model_dump()})
 
 
 @app.post("/api/transcript")
-async def submit_transcript_request(request: Request, body: SubmitRequest, background_tasks: BackgroundTasks):
+async def submit_transcript_request(request: Request, body: SubmitRequest):
     """Submit a transcript extraction request"""
-    # Validate API key and rate limit
     api_key = require_api_key(request)
-    if not limiter.allow(api_key):
-        raise HTTPException(status_code=429, detail="Rate limit exceeded (max 10 requests per hour)")
     
     # Validate YouTube URL
-    transcript_config = TranscriptConfig()
-    extractor = TranscriptExtractor(transcript_config)
-    if not extractor.is_youtube_url(str(body.url)):
+    if not url_checker.is_youtube_url(str(body.url)):
         raise HTTPException(status_code=400, detail="Invalid YouTube URL")
     
-    # Check disk space
-    if free_space_gb(cfg.transcripts_root) < cfg.free_space_gb_min:
-        raise HTTPException(status_code=507, detail="Insufficient disk space")
-    
-    # Create job
-    job_kind = "playlist" if "playlist" in str(body.url) else "video"
-    status = store.new_request(job_kind, str(body.url))
-    
-    # Set up languages
-    languages = body.languages if body.languages else cfg.allow_languages
-    
-    # Start background processing
-    background_tasks.add_task(
-        process_job,
-        status.request_id,
-        str(body.url),
-        body.format,
-        languages,
-        str(body.webhook_url) if body.webhook_url else None
-    )
-    
-    return {"request_id": status.request_id, "status": status.status}
+    # An identical submit is still between its duplicate check and queue.put(): wait for
+    # its request_id. Checking and claiming the key happen with no await in between.
+    key = (str(body.url), body.format)
+    while key in submitting:
+        existing = await asyncio.shield(submitting[key])
+        if existing:
+            return await deduplicated(existing)
+    claim = asyncio.get_running_loop().create_future()
+    submitting[key] = claim
+    request_id = None
+    try:
+        # Identical URL already queued or running: hand back that job (doesn't count against the limit)
+        existing = await run_io(queue.find_active, str(body.url), body.format)
+        if existing:
+            request_id = existing
+            return await deduplicated(existing)
+        
+        if not limiter.allow(api_key):
+            raise HTTPException(status_code=429, detail="Rate limit exceeded (max 10 requests per hour)")
+        
+        # Check disk space
+        if await run_io(free_space_gb, cfg.transcripts_root) < cfg.free_space_gb_min:
+            raise HTTPException(status_code=507, detail="Insufficient disk space")
+        
+        # Create job
+        job_kind = "playlist" if "playlist" in str(body.url) else "video"
+        status = await run_io(store.new_request, job_kind, str(body.url), api_key)
+        
+        # Set up languages
+        languages = body.languages if body.languages else cfg.allow_languages
+        
+        # Queue for the workers (persisted, so it survives a restart)
+        await queue.enqueue(
+            status.request_id,
+            str(body.url),
+            body.format,
+            languages,
+            str(body.webhook_url) if body.webhook_url else None
+        )
+        request_id = status.request_id
+        
+        return {"request_id": status.request_id, "status": status.status}
+    finally:
+        # Waiters get the job, or None to run the checks themselves if this submit failed
+        del submitting[key]
+        claim.set_result(request_id)
+
+
+async def deduplicated(request_id: str) -> Dict:
+    """Response for a submit that matched a job already queued or running"""
+    status = await run_io(store.load, request_id)
+    return {"request_id": request_id, "status": status.status if status else "queued", "deduplicated": True}
 
 
 @app.get("/api/status/{request_id}")
 async def get_job_status(request_id: str):
     """Get job status"""
-    status = store.load(request_id)
+    status = await run_io(store.load, request_id)
     if not status:
         raise HTTPException(status_code=404, detail="Job not found")
     
     return JSONResponse(status.model_dump())
 
 
+@app.get("/api/events/{request_id}")
+async def job_events(request_id: str, request: Request):
+    """Server-Sent Events stream of a job's progress; ends when the job completes or fails.
+    
+    Events: "status" (full job status), "queued" (video total), "video" (per-video
+    done/total, progress, eta_seconds and the partial file that just became available).
+    """
+    # Subscribe before reading the status so nothing published in between is missed
+    subscriber = hub.subscribe(request_id)
+    status = await run_io(store.load, request_id)
+    if not status:
+        hub.unsubscribe(request_id, subscriber)
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    def sse(event: Dict) -> str:
+        return f"event: {event.get('event', 'message')}\ndata: {json.dumps(event)}\n\n"
+    
+    async def stream():
+        try:
+            yield sse({"event": "status", **status.model_dump()})
+            if status.status in ("complete", "error"):
+                return
+            latest = hub.latest.get(request_id)
+            if latest and latest.get("event") != "status":
+                # Mid-playlist: also replay the last per-video event
+                yield sse(latest)
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscriber.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        return
+                    yield ": keep-alive\n\n"
+                    continue
+                yield sse(event)
+                if event.get("event") == "status" and event.get("status") in ("complete", "error"):
+                    return
+        finally:
+            hub.unsubscribe(request_id, subscriber)
+    
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
 @app.get("/api/download/{request_id}")
-async def download_results(request_id: str):
-    """Download job results as zip file"""
-    zip_path = store.zip_result(request_id)
-    if not zip_path:
+async def download_results(request_id: str, request: Request):
+    """Download job results as zip file.
+    
+    The zip is compressed straight into the response, so the first byte does not wait
+    for the whole playlist; the same bytes are teed into the zip cache. Once cached,
+    the ETag allows 304s and Range/If-Range requests resume interrupted downloads.
+    """
+    entries = await run_io(store.result_entries, request_id)
+    if not entries:
         raise HTTPException(status_code=404, detail="Results not available")
     
-    async def file_generator():
-        with open(zip_path, "rb") as f:
-            while chunk := f.read(1024 * 1024):  # 1MB chunks
+    etag = f'"{await run_io(zip_etag, entries)}"'
+    headers = {
+        "Content-Disposition": f'attachment; filename="{request_id}.zip"',
+        "ETag": etag,
+        "Accept-Ranges": "bytes" if zip_cache else "none",
+    }
+    if etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers=headers)
+    
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and if_range and if_range != etag:
+        range_header = None  # Results changed since the partial download: send everything
+    
+    cached = await run_io(zip_cache.get, request_id, etag.strip('"')) if zip_cache else None
+    if range_header and zip_cache and not cached:
+        # Resuming needs stable bytes on disk; build the cached copy first
+        cached = await run_io(zip_cache.build, request_id, etag.strip('"'), entries)
+    
+    if cached:
+        size = (await run_io(cached.stat)).st_size
+        start, end = 0, size - 1
+        status_code = 200
+        if range_header:
+            try:
+                byte_range = parse_range(range_header, size)
+            except ValueError:
+                return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+            if byte_range:
+                start, end = byte_range
+                status_code = 206
+                headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        headers["Content-Length"] = str(end - start + 1)
+        
+        async def cached_generator():
+            f = await run_io(open, cached, "rb")
+            try:
+                await run_io(f.seek, start)
+                remaining = end - start + 1
+                while remaining > 0:
+                    chunk = await run_io(f.read, min(1024 * 1024, remaining))  # 1MB chunks
+                    if not chunk:
+                        break
+                    remaining -= len(chunk)
+                    yield chunk
+            finally:
+                f.close()
+        
+        return StreamingResponse(cached_generator(), status_code=status_code,
+                                 media_type="application/zip", headers=headers)
+    
+    async def zip_generator():
+        tmp = await run_io(zip_cache.open_temp) if zip_cache else None
+        chunks = iter_zip(entries, tee=tmp)
+        completed = False
+        try:
+            while (chunk := await run_io(next, chunks, None)) is not None:
                 yield chunk
+            completed = True
+        finally:
+            if tmp:
+                if completed:
+                    await run_io(zip_cache.commit, tmp, request_id, etag.strip('"'))
+                else:
+                    # Client went away mid-stream; the partial copy is useless
+                    await run_io(zip_cache.discard, tmp)
     
-    return StreamingResponse(
-        file_generator(),
-        media_type="application/zip",
-        headers={"Content-Disposition": f'attachment; filename="{request_id}.zip"'}
-    )
+    return StreamingResponse(zip_generator(), media_type="application/zip", headers=headers)
 
 
 @app.get("/api/list")
-async def list_jobs():
-    """List recent jobs"""
-    jobs = store.list_recent(100)
-    return {"jobs": [job.model_dump() for job in jobs]}
+async def list_jobs(request: Request, limit: int = 100, cursor: Optional[str] = None,
+                    status: Optional[str] = None, mine: bool = False):
+    """List recent jobs, newest first; pass next_cursor back as cursor for the next page"""
+    api_key = require_api_key(request) if mine else None
+    try:
+        jobs, next_cursor = await run_io(store.list_recent, max(1, min(limit, 500)), cursor, status, api_key)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"jobs": [job.model_dump() for job in jobs], "next_cursor": next_cursor}
+
+
+@app.get("/api/search")
+async def search_transcripts(q: str, limit: int = 20):
+    """Full-text search over transcript sections, with deep links to each match"""
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="Empty query")
+    limit = max(1, min(limit, 100))
+    
+    def run_search() -> List[Dict]:
+        index = TranscriptIndex(cfg.index_db)
+        try:
+            return index.search(q, limit)
+        finally:
+            index.close()
+    
+    results = await run_io(run_search)
+    return {"query": q, "results": results}
 
 
 @app.get("/health")
@@ -369,10 +1026,22 @@ async def health_check():
     return {
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
-        "disk_space_gb": free_space_gb(cfg.transcripts_root)
+        "disk_space_gb": await run_io(free_space_gb, cfg.transcripts_root),
+        "queue": await run_io(queue.depth),
+        "event_loop_lag_seconds": round(loop_lag.last, 4),
+        "event_loop_lag_max_seconds": round(loop_lag.peak, 4)
     }
 
 
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics (event loop lag, queue depth)"""
+    if not Histogram:
+        raise HTTPException(status_code=404, detail="prometheus_client not installed")
+    # The queue gauges read SQLite while collecting
+    return Response(await run_io(generate_latest), media_type=CONTENT_TYPE_LATEST)
+
+
 @app.get("/")
 async def root():
     """Root endpoint with API info"""
@@ -382,9 +1051,12 @@ async def root():
         "endpoints": {
             "submit": "POST /api/transcript",
             "status": "GET /api/status/{request_id}",
+            "events": "GET /api/events/{request_id} (SSE)",
             "download": "GET /api/download/{request_id}",
             "list": "GET /api/list",
-            "health": "GET /health"
+            "search": "GET /api/search?q=...",
+            "health": "GET /health",
+            "metrics": "GET /metrics"
         }
     }
 
@@ -6,14 +6,23 @@ HWC NixOS Homeserver - Transcript extraction from YouTube videos/playlists
 
 import argparse
 import asyncio
+import hashlib
+import html
+import importlib.util
 import json
+import multiprocessing
 import os
+import random
 import re
+import shutil
 import sys
+import tempfile
+import threading
 import time
-from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Dict, IO, Iterator, List, Optional, Tuple
 from urllib.parse import urlparse, parse_qs
 
 try:
@@ -26,6 +35,19 @@ except ImportError as e:
     print("Install with: pip install yt-dlp youtube-transcript-api httpx python-slugify")
     sys.exit(1)
 
+# Optional: columnar segment store
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+# Optional: full-text search index (scripts/transcript_index.py)
+try:
+    from transcript_index import TranscriptIndex
+except ImportError:
+    TranscriptIndex = None
+
 
 class Config:
     """Configuration for transcript extraction"""
@@ -36,14 +58,413 @@ class Config:
         self.hot_root = Path(os.getenv("HOT_ROOT", "/mnt/hot"))
         self.allow_languages = os.getenv("LANGS", "en,en-US,en-GB").split(",")
         self.timezone = os.getenv("TZ", "America/Denver")
+        # Concurrency and politeness
+        self.workers = int(os.getenv("YT_WORKERS", "4"))
+        self.host_delay = float(os.getenv("YT_HOST_DELAY", "1.0"))
+        self.max_retries = int(os.getenv("YT_RETRIES", "4"))
+        # Metadata/subtitle cache on the hot tier
+        self.cache_enabled = os.getenv("YT_CACHE", "1") == "1"
+        self.cache_dir = Path(os.getenv("YT_CACHE_DIR", str(self.hot_root / "cache" / "yt-transcript")))
+        self.cache_info_ttl = float(os.getenv("YT_CACHE_INFO_TTL_HOURS", "168")) * 3600
+        self.cache_vtt_ttl = float(os.getenv("YT_CACHE_VTT_TTL_DAYS", "30")) * 86400
+        self.cache_max_bytes = int(float(os.getenv("YT_CACHE_MAX_MB", "512")) * 1024 * 1024)
+        # Machine-readable segments next to each markdown file: jsonl, parquet or none
+        self.segments_format = os.getenv("YT_SEGMENTS_FORMAT", "jsonl")
+        # Search index, updated as transcripts are written
+        self.index_enabled = os.getenv("YT_INDEX", "1") == "1"
+        self.index_db = Path(os.getenv("TRANSCRIPT_INDEX_DB", str(self.transcripts_root / ".index" / "transcripts.db")))
+        # Local speech-to-text (faster-whisper, CPU) for videos without captions
+        self.asr_enabled = os.getenv("ASR_FALLBACK", "0") == "1"
+        self.asr_model = os.getenv("ASR_MODEL", "base")
+        self.asr_workers = int(os.getenv("ASR_WORKERS", "2"))
+        self.asr_threads = int(os.getenv("ASR_THREADS", "2"))
+        self.asr_max_jobs = int(os.getenv("ASR_MAX_JOBS", "1"))
+        self.asr_chunk_seconds = int(os.getenv("ASR_CHUNK_SECONDS", "600"))
+
+
+class RateLimited(Exception):
+    """Raised when a remote host answers 429 Too Many Requests"""
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+# yt-dlp reports throttling as "HTTP Error 429: Too Many Requests"; a bare "429"
+# can also be part of a video id or URL in the message
+HTTP_429_RE = re.compile(r"\bHTTP Error 429\b")
+
+def is_rate_limited(error: Exception) -> bool:
+    """Whether a yt-dlp DownloadError was caused by an HTTP 429 response"""
+    cause = (getattr(error, "exc_info", None) or (None, None))[1]
+    if getattr(cause, "status", None) == 429 or getattr(cause, "code", None) == 429:
+        return True
+    return bool(HTTP_429_RE.search(str(error)))
+
+
+# Per-playlist record of processed videos, used by --sync
+MANIFEST_NAME = ".manifest.json"
+
+def segments_path(markdown_path: Path, fmt: str = "jsonl") -> Path:
+    """Segment store that sits next to a transcript markdown file"""
+    return markdown_path.with_name(f"{markdown_path.stem}.segments.{fmt}")
+
+
+def load_segments(path: Path, since: float = 0.0, chunk: Optional[int] = None) -> Iterator[Dict]:
+    """Lazily yield segment rows from a .segments.jsonl/.parquet file.
+    
+    Rows are in time order; since= skips everything starting before that many
+    seconds and chunk= restricts to one markdown section.
+    """
+    def wanted(row: Dict) -> bool:
+        return row["start"] >= since and (chunk is None or row["chunk"] == chunk)
+    
+    if path.suffix == ".parquet":
+        if pq is None:
+            raise RuntimeError("pyarrow is required to read parquet segments")
+        yield from filter(wanted, pq.read_table(path).to_pylist())
+        return
+    
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                row = json.loads(line)
+                if wanted(row):
+                    yield row
+
+
+# Local ASR: one process pool and one job limit per process, shared by every extractor
+_asr_pool: Optional[ProcessPoolExecutor] = None
+_asr_slots: Optional[threading.BoundedSemaphore] = None
+_asr_lock = threading.Lock()
+# Per worker process: the loaded model, keyed by (name, threads)
+_asr_model = None
+
+
+def asr_resources(config: "Config") -> Tuple[ProcessPoolExecutor, threading.BoundedSemaphore]:
+    """Process pool and job semaphore for local ASR, created on first use"""
+    global _asr_pool, _asr_slots
+    with _asr_lock:
+        if _asr_pool is None:
+            # spawn: forking a threaded event-loop process is not safe
+            _asr_pool = ProcessPoolExecutor(max_workers=max(1, config.asr_workers),
+                                            mp_context=multiprocessing.get_context("spawn"))
+            _asr_slots = threading.BoundedSemaphore(max(1, config.asr_max_jobs))
+        return _asr_pool, _asr_slots
+
+
+def transcribe_chunk(path: str, offset: float, model_name: str, threads: int,
+                     language: Optional[str]) -> List[Dict]:
+    """Transcribe one audio chunk in an ASR worker process (runs in the pool)"""
+    global _asr_model
+    from faster_whisper import WhisperModel
+    
+    if _asr_model is None or _asr_model[0] != (model_name, threads):
+        _asr_model = ((model_name, threads),
+                      WhisperModel(model_name, device="cpu", compute_type="int8", cpu_threads=threads))
+    segments, _ = _asr_model[1].transcribe(path, language=language, vad_filter=True)
+    return [
+        {"start": round(offset + seg.start, 3), "end": round(offset + seg.end, 3), "text": seg.text.strip()}
+        for seg in segments if seg.text.strip()
+    ]
+
+
+class TranscriptCache:
+    """On-disk cache of yt-dlp info subsets and raw VTT, keyed by video id (and language).
+    
+    Entries older than their TTL are still returned as stale so the caller can
+    revalidate them (VTT via ETag) instead of refetching. File mtimes double as
+    LRU access times; prune() evicts least recently used entries (a VTT body and
+    its meta together) over max_bytes.
+    """
+    # Fields kept from yt-dlp's info dict; everything else is dropped
+    INFO_KEYS = ("id", "title", "channel", "uploader", "upload_date", "duration", "webpage_url",
+                 "subtitles", "automatic_captions", "requested_subtitles")
+    
+    def __init__(self, root: Path, info_ttl: float, vtt_ttl: float, max_bytes: int):
+        self.root = root
+        self.info_ttl = info_ttl
+        self.vtt_ttl = vtt_ttl
+        self.max_bytes = max_bytes
+        (root / "info").mkdir(parents=True, exist_ok=True)
+        (root / "vtt").mkdir(parents=True, exist_ok=True)
+    
+    @staticmethod
+    def _key(*parts: str) -> str:
+        # Video ids and language codes are filename-safe, but don't trust that blindly
+        return "-".join(re.sub(r"[^A-Za-z0-9_.-]", "_", part) for part in parts)
+    
+    def _read_json(self, path: Path) -> Optional[Dict]:
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        os.utime(path)  # Mark as recently used
+        return data
+    
+    def _write(self, path: Path, text: str) -> None:
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        tmp.write_text(text, encoding="utf-8")
+        tmp.replace(path)
+    
+    @classmethod
+    def info_subset(cls, info: Dict) -> Dict:
+        """Trim an info dict to what transcripts need; subtitle listings keep only VTT"""
+        subset = {key: info.get(key) for key in cls.INFO_KEYS}
+        for key in ("subtitles", "automatic_captions"):
+            subset[key] = {
+                lang: [entry for entry in entries if isinstance(entry, dict) and entry.get("ext") == "vtt"]
+                for lang, entries in (info.get(key) or {}).items()
+                if isinstance(entries, list)
+            }
+        subset["requested_subtitles"] = {
+            lang: {k: v for k, v in (entry or {}).items() if k in ("ext", "url")}
+            for lang, entry in (info.get("requested_subtitles") or {}).items()
+        }
+        return subset
+    
+    def get_info(self, video_id: str) -> Optional[Dict]:
+        """Cached info for a video, or None if missing or past its TTL"""
+        data = self._read_json(self.root / "info" / f"{self._key(video_id)}.json")
+        if not data or time.time() - data.get("fetched_at", 0) > self.info_ttl:
+            return None
+        return data["info"]
+    
+    def put_info(self, info: Dict) -> None:
+        """Store the transcript-relevant subset of an info dict"""
+        if not info.get("id"):
+            return
+        payload = {"fetched_at": time.time(), "info": self.info_subset(info)}
+        self._write(self.root / "info" / f"{self._key(info['id'])}.json", json.dumps(payload))
+    
+    def get_vtt(self, video_id: str, lang: str) -> Optional[Tuple[str, Dict]]:
+        """Cached (vtt_text, meta) for a video/language; meta["fresh"] says if it is within TTL"""
+        key = self._key(video_id, lang)
+        meta = self._read_json(self.root / "vtt" / f"{key}.json")
+        if not meta:
+            return None
+        vtt_path = self.root / "vtt" / f"{key}.vtt"
+        try:
+            text = vtt_path.read_text(encoding="utf-8")
+            os.utime(vtt_path)
+        except OSError:
+            return None
+        meta["fresh"] = time.time() - meta.get("fetched_at", 0) <= self.vtt_ttl
+        return text, meta
+    
+    def open_vtt(self, video_id: str, lang: str) -> IO[str]:
+        """Temporary file that raw VTT is streamed into; finish with commit_vtt()"""
+        key = self._key(video_id, lang)
+        return open(self.root / "vtt" / f"{key}.vtt.tmp", "w", encoding="utf-8")
+    
+    def commit_vtt(self, video_id: str, lang: str, sink: IO[str], etag: Optional[str]) -> None:
+        """Publish a fully streamed VTT file along with its validator"""
+        key = self._key(video_id, lang)
+        sink.close()
+        Path(sink.name).replace(self.root / "vtt" / f"{key}.vtt")
+        self._write(self.root / "vtt" / f"{key}.json", json.dumps({"fetched_at": time.time(), "etag": etag}))
+    
+    def discard_vtt(self, sink: IO[str]) -> None:
+        """Drop a partially streamed VTT file"""
+        sink.close()
+        Path(sink.name).unlink(missing_ok=True)
+    
+    def revalidated_vtt(self, video_id: str, lang: str) -> None:
+        """Restart the TTL of a VTT entry after a 304 Not Modified"""
+        key = self._key(video_id, lang)
+        meta = self._read_json(self.root / "vtt" / f"{key}.json") or {}
+        meta["fetched_at"] = time.time()
+        self._write(self.root / "vtt" / f"{key}.json", json.dumps(meta))
+    
+    def prune(self) -> None:
+        """Evict least recently used entries until the cache fits in max_bytes"""
+        # Group each entry's files (.json, .vtt, stray .tmp); last use is the newest mtime
+        entries: Dict[Path, List] = {}
+        for path in self.root.rglob("*"):
+            try:
+                if not path.is_file():
+                    continue
+                st = path.stat()
+            except OSError:
+                continue
+            name = path.name[:-len(".tmp")] if path.name.endswith(".tmp") else path.name
+            entry = entries.setdefault(path.parent / Path(name).stem, [0.0, 0, []])
+            entry[0] = max(entry[0], st.st_mtime)
+            entry[1] += st.st_size
+            entry[2].append(path)
+        total = sum(size for _, size, _ in entries.values())
+        for _, size, paths in sorted(entries.values(), key=lambda entry: entry[0]):
+            if total <= self.max_bytes:
+                break
+            for path in paths:
+                path.unlink(missing_ok=True)
+            total -= size
+
+
+class VTTParser:
+    """Incremental WebVTT parser that collapses YouTube's rolling auto-captions.
+    
+    Auto-captions show each line two or three times (typed in with inline timing
+    tags, then carried over as the top line of the next cues). Once inline timing
+    tags show the track is rolling, the leading lines of a cue that repeat the end
+    of the previous cue are dropped, so every spoken line appears once; other
+    subtitles are kept as written.
+    Feed text chunks as they arrive; each call returns the segments completed so far.
+    """
+    TAG_RE = re.compile(r"<[^>]*>")
+    INLINE_TIME_RE = re.compile(r"<(?:\d+:)?\d{2}:\d{2}\.\d{3}>")
+    TIMESTAMP_RE = re.compile(r"(?:(\d+):)?(\d{2}):(\d{2})\.(\d{3})")
+    
+    def __init__(self):
+        self.buffer = ""
+        self.cue: Optional[Dict] = None
+        self.rolling = False
+        self.previous: List[str] = []
+        self.last: Optional[Dict] = None
+    
+    @classmethod
+    def parse_timestamp(cls, ts: str) -> float:
+        """Parse '01:23:45.678' or '23:45.678' to seconds"""
+        match = cls.TIMESTAMP_RE.match(ts.strip())
+        if not match:
+            raise ValueError(f"bad VTT timestamp: {ts!r}")
+        h, m, s, ms = match.groups()
+        return int(h or 0) * 3600 + int(m) * 60 + int(s) + int(ms) / 1000.0
+    
+    def _finish_cue(self) -> Optional[Dict]:
+        cue, self.cue = self.cue, None
+        if not cue:
+            return None
+        
+        lines = []
+        for line in cue["lines"]:
+            if self.INLINE_TIME_RE.search(line):
+                self.rolling = True
+            text = html.unescape(" ".join(self.TAG_RE.sub("", line).split()))
+            if text:
+                lines.append(text)
+        
+        new_lines = lines
+        if self.rolling:
+            # Longest run of leading lines carried over from the end of the previous cue
+            for overlap in range(min(len(lines), len(self.previous)), 0, -1):
+                if lines[:overlap] == self.previous[-overlap:]:
+                    new_lines = lines[overlap:]
+                    break
+        self.previous = lines
+        
+        if not new_lines:
+            # Pure repeat of earlier captions: just stretch the previous segment
+            if self.last and cue["end"] > self.last["end"]:
+                self.last["end"] = cue["end"]
+            return None
+        
+        self.last = {"start": cue["start"], "end": cue["end"], "text": " ".join(new_lines)}
+        return self.last
+    
+    def _line(self, line: str) -> Optional[Dict]:
+        line = line.rstrip("\r")
+        if self.cue is not None:
+            # Only a truly empty line ends a cue; auto-captions pad cues with " " lines
+            if line:
+                self.cue["lines"].append(line)
+                return None
+            return self._finish_cue()
+        if "-->" in line:
+            left, right = line.split("-->", 1)
+            try:
+                self.cue = {"start": self.parse_timestamp(left),
+                            "end": self.parse_timestamp(right.split()[0]) if right.split() else 0.0,
+                            "lines": []}
+            except ValueError:
+                self.cue = None
+        return None
+    
+    def feed(self, chunk: str) -> List[Dict]:
+        """Consume a chunk of VTT text and return newly completed segments"""
+        self.buffer += chunk
+        *lines, self.buffer = self.buffer.split("\n")
+        segments = []
+        for line in lines:
+            segment = self._line(line)
+            if segment:
+                segments.append(segment)
+        return segments
+    
+    def close(self) -> List[Dict]:
+        """Flush the final partial line and cue"""
+        segments = self.feed("\n") if self.buffer else []
+        segment = self._finish_cue()
+        if segment:
+            segments.append(segment)
+        return segments
+    
+    def parse(self, vtt_text: str) -> List[Dict]:
+        """Parse a complete VTT document"""
+        return self.feed(vtt_text) + self.close()
+
+
+class BatchState:
+    """Resumable progress of a batch run, persisted as JSON after every change"""
+    
+    def __init__(self, path: Path):
+        self.path = path
+        data: Dict = {}
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            pass
+        self.done: Dict[str, str] = data.get("done", {})
+        # Failures are retried on the next run, so start with a clean slate
+        self.failed: Dict[str, str] = {}
+        # Playlist/channel URLs that could not be listed, kept apart from video failures
+        self.unlisted: Dict[str, str] = {}
+    
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"done": self.done, "failed": self.failed, "unlisted": self.unlisted}, indent=2),
+                       encoding="utf-8")
+        tmp.replace(self.path)
+    
+    def mark_done(self, video_id: str, path: Path) -> None:
+        self.done[video_id] = str(path)
+        self.failed.pop(video_id, None)
+        self.save()
+    
+    def mark_failed(self, video_id: str, error: str) -> None:
+        self.failed[video_id] = error
+        self.save()
+    
+    def remove(self) -> None:
+        self.path.unlink(missing_ok=True)
+
+
+class HostThrottle:
+    """Spaces out requests to the same host by at least min_interval seconds"""
+    def __init__(self, min_interval: float):
+        self.min_interval = min_interval
+        self.locks: Dict[str, asyncio.Lock] = {}
+        self.last_request: Dict[str, float] = {}
+    
+    async def wait(self, host: str) -> None:
+        """Block until it is polite to send another request to host"""
+        lock = self.locks.setdefault(host, asyncio.Lock())
+        async with lock:
+            delay = self.last_request.get(host, 0.0) + self.min_interval - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self.last_request[host] = time.monotonic()
 
 
 class TranscriptExtractor:
     """Main class for extracting YouTube transcripts"""
     
-    def __init__(self, config: Config):
+    def __init__(self, config: Config, progress: Optional[Callable[[Dict], None]] = None):
         self.config = config
+        # Optional progress listener, called with {"event": ...} dicts as work completes
+        self.progress = progress
         self.youtube_re = re.compile(r"(https?://)?(www\.)?(youtube\.com|youtu\.be)/")
+        self.channel_path_re = re.compile(r"^/(@[^/]+|channel/[^/]+|c/[^/]+|user/[^/]+)")
         
         # yt-dlp configuration
         self.ydl_opts_base = {
@@ -56,11 +477,112 @@ class TranscriptExtractor:
             "extract_flat": False,
             "subtitleslangs": ["en", "en-US", "en-GB", "en.*"],  # More aggressive language matching
         }
+        
+        # Shared HTTP client and per-host politeness, created lazily per event loop
+        self.http: Optional[httpx.AsyncClient] = None
+        self.throttle = HostThrottle(config.host_delay)
+        # Full infos fetched while windowing a channel, reused when the video is processed
+        self.prefetched: Dict[str, Dict] = {}
+        
+        # Metadata/subtitle cache; an unwritable HOT_ROOT just disables it
+        self.cache: Optional[TranscriptCache] = None
+        if config.cache_enabled:
+            try:
+                self.cache = TranscriptCache(config.cache_dir, config.cache_info_ttl,
+                                             config.cache_vtt_ttl, config.cache_max_bytes)
+            except OSError as e:
+                print(f"⚠ Transcript cache disabled ({config.cache_dir}): {e}")
+        
+        # Search index; like the cache, optional and never fatal
+        self.index = None
+        if config.index_enabled and TranscriptIndex is not None:
+            try:
+                self.index = TranscriptIndex(config.index_db)
+            except Exception as e:
+                print(f"⚠ Transcript index disabled ({config.index_db}): {e}")
+    
+    def client(self) -> httpx.AsyncClient:
+        """Shared keep-alive client for subtitle downloads"""
+        if self.http is None:
+            self.http = httpx.AsyncClient(
+                timeout=30,
+                limits=httpx.Limits(max_connections=self.config.workers * 2,
+                                    max_keepalive_connections=self.config.workers)
+            )
+        return self.http
+    
+    async def aclose(self) -> None:
+        """Close the shared HTTP client and trim the cache"""
+        if self.http is not None:
+            await self.http.aclose()
+            self.http = None
+        if self.cache:
+            await asyncio.to_thread(self.cache.prune)
+        if self.index:
+            self.index.close()
+            self.index = None
+    
+    async def with_retries(self, op, what: str):
+        """Run an async operation, backing off and retrying on HTTP 429"""
+        for attempt in range(self.config.max_retries + 1):
+            try:
+                return await op()
+            except RateLimited as e:
+                if attempt == self.config.max_retries:
+                    raise
+                delay = e.retry_after or min(60.0, 2 ** attempt * 2) + random.uniform(0, 1)
+                print(f"⚠ Rate limited on {what}, retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+    
+    def _extract_info(self, url: str, opts: Dict) -> Dict:
+        """Blocking yt-dlp extraction; run via asyncio.to_thread"""
+        try:
+            with yt_dlp.YoutubeDL(opts) as ydl:
+                return ydl.extract_info(url, download=False)
+        except yt_dlp.utils.DownloadError as e:
+            if is_rate_limited(e):
+                raise RateLimited(str(e)) from e
+            raise
+    
+    async def extract_info(self, url: str, opts: Dict) -> Dict:
+        """yt-dlp extraction on a worker thread, throttled per host and retried on 429"""
+        host = urlparse(url).hostname or "youtube.com"
+        
+        async def attempt():
+            await self.throttle.wait(host)
+            return await asyncio.to_thread(self._extract_info, url, opts)
+        
+        return await self.with_retries(attempt, url)
     
     def is_youtube_url(self, url: str) -> bool:
         """Check if URL is a valid YouTube URL"""
         return bool(self.youtube_re.search(url))
     
+    def channel_videos_url(self, url: str) -> Optional[str]:
+        """The /videos tab of a channel URL (/@handle, /channel/, /c/, /user/), or None"""
+        match = self.channel_path_re.match(urlparse(url).path)
+        if not match:
+            return None
+        return f"https://www.youtube.com/{match.group(1)}/videos"
+    
+    @staticmethod
+    def parse_since(value: str) -> str:
+        """'30d', '2025-01-31' or '20250131' to a YYYYMMDD date"""
+        value = value.strip()
+        if value.endswith("d") and value[:-1].isdigit():
+            return (datetime.now() - timedelta(days=int(value[:-1]))).strftime("%Y%m%d")
+        return datetime.strptime(value.replace("-", ""), "%Y%m%d").strftime("%Y%m%d")
+    
+    @staticmethod
+    def entry_upload_date(entry: Dict) -> Optional[str]:
+        """YYYYMMDD upload date of a (flat or full) info dict, if it carries one"""
+        if entry.get("upload_date"):
+            return entry["upload_date"]
+        timestamp = entry.get("timestamp") or entry.get("release_timestamp")
+        if timestamp:
+            return datetime.fromtimestamp(timestamp, timezone.utc).strftime("%Y%m%d")
+        return None
+    
     def sanitize_filename(self, name: str) -> str:
         """Create safe filename from title"""
         return slugify(name, lowercase=True, max_length=120)
@@ -101,12 +623,8 @@ class TranscriptExtractor:
         ]
         return "\n".join(lines)
     
-    def format_sections(self, transcript: List[Dict], mode: str = "standard") -> str:
-        """Format transcript segments into markdown sections"""
-        if not transcript:
-            return "_No transcript available._\n"
-        
-        # Group segments into sections based on timing gaps
+    def group_segments(self, transcript: List[Dict], mode: str = "standard") -> List[List[Dict]]:
+        """Group segments into sections based on timing gaps"""
         bucket = []
         chunks: List[List[Dict]] = []
         last_time = None
@@ -123,6 +641,14 @@ class TranscriptExtractor:
         
         if bucket:
             chunks.append(bucket)
+        return chunks
+    
+    def format_sections(self, transcript: List[Dict], mode: str = "standard") -> str:
+        """Format transcript segments into markdown sections"""
+        if not transcript:
+            return "_No transcript available._\n"
+        
+        chunks = self.group_segments(transcript, mode)
         
         # Format chunks into markdown sections
         sections = []
@@ -134,15 +660,37 @@ class TranscriptExtractor:
             # Join text from all segments in this chunk and clean up VTT timing codes
             paragraph_text = " ".join([seg["text"].strip() for seg in chunk if seg["text"].strip()])
             
-            # Remove VTT timing codes like <00:01:23.456><c> or <00:01:23>
-            import re
-            paragraph_text = re.sub(r'<[\d:.<>c/\s]*>', '', paragraph_text)
-            paragraph_text = paragraph_text.replace("  ", " ").strip()
+            # Remove any VTT timing codes like <00:01:23.456><c> left in the text
+            paragraph_text = " ".join(VTTParser.TAG_RE.sub("", paragraph_text).split())
             sections.append(paragraph_text)
             sections.append("")
         
         return "\n".join(sections)
     
+    def write_segments(self, markdown_path: Path, video_id: str, chunks: List[List[Dict]]) -> Optional[Path]:
+        """Write per-segment rows (chunk ids match the markdown section numbers)"""
+        fmt = self.config.segments_format
+        if fmt == "none":
+            return None
+        if fmt == "parquet" and pq is None:
+            print("⚠ pyarrow not installed, writing JSONL segments instead")
+            fmt = "jsonl"
+        
+        rows = [
+            {"video_id": video_id, "chunk": chunk_id, "start": seg["start"],
+             "end": seg.get("end", seg["start"]), "text": seg["text"]}
+            for chunk_id, chunk in enumerate(chunks, start=1)
+            for seg in chunk
+        ]
+        path = segments_path(markdown_path, fmt)
+        if fmt == "parquet":
+            pq.write_table(pa.Table.from_pylist(rows), path)
+        else:
+            with open(path, "w", encoding="utf-8") as f:
+                for row in rows:
+                    f.write(json.dumps(row, ensure_ascii=False) + "\n")
+        return path
+    
     def format_playlist_overview(self, playlist_name: str, videos: List[Dict]) -> str:
         """Format playlist overview with table of contents"""
         lines = [
@@ -166,43 +714,7 @@ class TranscriptExtractor:
     
     def parse_vtt_to_segments(self, vtt_text: str) -> List[Dict]:
         """Parse VTT subtitle format to transcript segments"""
-        lines = vtt_text.splitlines()
-        segments = []
-        
-        def parse_timestamp(ts: str) -> float:
-            """Parse timestamp like '00:01:23.456' to seconds"""
-            h, m, s_ms = ts.split(":")
-            s, ms = s_ms.split(".")
-            return int(h) * 3600 + int(m) * 60 + int(s) + int(ms) / 1000.0
-        
-        i = 0
-        while i < len(lines):
-            line = lines[i].strip()
-            if "-->" in line:
-                # Found timestamp line
-                left, right = [x.strip() for x in line.split("-->")]
-                start_time = parse_timestamp(left)
-                
-                # Collect text lines until empty line or end
-                i += 1
-                text_lines = []
-                while i < len(lines) and lines[i].strip():
-                    text_lines.append(lines[i].strip())
-                    i += 1
-                
-                if text_lines:
-                    # Clean VTT timing codes from text
-                    clean_text = " ".join(text_lines)
-                    clean_text = re.sub(r'<[\d:.<>c/\s]*>', '', clean_text)
-                    clean_text = clean_text.replace("  ", " ").strip()
-                    
-                    segments.append({
-                        "start": start_time,
-                        "text": clean_text
-                    })
-            i += 1
-        
-        return segments
+        return VTTParser().parse(vtt_text)
     
     def extract_video_id(self, url: str) -> str:
         """Extract video ID from YouTube URL"""
@@ -212,115 +724,268 @@ class TranscriptExtractor:
         elif parsed.hostname in ['youtube.com', 'www.youtube.com']:
             if parsed.path == '/watch':
                 return parse_qs(parsed.query)['v'][0]
-            elif parsed.path.startswith('/v/'):
+            elif parsed.path.startswith(('/v/', '/shorts/', '/live/')):
                 return parsed.path.split('/')[2]
         return ""
     
-    async def get_video_info(self, url: str) -> Dict:
-        """Get video metadata using yt-dlp"""
-        with yt_dlp.YoutubeDL({**self.ydl_opts_base, "dump_single_json": True}) as ydl:
-            return ydl.extract_info(url, download=False)
+    def subtitle_langs(self, prefer_langs: Optional[List[str]] = None) -> List[str]:
+        """Subtitle languages to request from yt-dlp"""
+        return (prefer_langs or []) + ["en", "en-US", "en-GB", "en.*"]  # Broader language search
     
-    async def fetch_transcript_segments(self, video_id: str, prefer_langs: List[str]) -> List[Dict]:
-        """Fetch transcript segments using yt-dlp subtitle download"""
-        # Skip YouTube Transcript API for now, go directly to yt-dlp
-        # try:
-        #     transcript = YouTubeTranscriptApi.get_transcript(video_id, languages=prefer_langs)
-        #     return [{"start": t["start"], "text": t["text"]} for t in transcript]
-        # except (TranscriptsDisabled, NoTranscriptFound, VideoUnavailable):
-        #     pass
+    async def get_video_info(self, url: str, prefer_langs: Optional[List[str]] = None) -> Dict:
+        """Get video metadata and subtitle listings using yt-dlp (one extraction)"""
+        opts = {**self.ydl_opts_base, "subtitleslangs": self.subtitle_langs(prefer_langs)}
+        info = await self.extract_info(url, opts)
+        if self.cache:
+            self.cache.put_info(info)
+        return info
+    
+    async def load_video_info(self, url: str, prefer_langs: Optional[List[str]] = None) -> Dict:
+        """Video info from the cache when fresh, otherwise from yt-dlp.
         
-        # Fallback to yt-dlp subtitle extraction
-        opts = {**self.ydl_opts_base}
-        opts["subtitleslangs"] = prefer_langs + ["en", "en-US", "en-GB", "en.*"]  # Broader language search
+        Cached info is marked with "_cached" because its subtitle URLs are signed
+        and may have expired by the time they are used.
+        """
+        video_id = self.extract_video_id(url)
+        if video_id in self.prefetched:
+            return self.prefetched.pop(video_id)
+        if self.cache and video_id:
+            info = self.cache.get_info(video_id)
+            if info:
+                return {**info, "_cached": True}
+        return await self.get_video_info(url, prefer_langs)
+    
+    def select_subtitle(self, info: Dict, prefer_langs: List[str]) -> Optional[Tuple[str, str]]:
+        """Pick the best VTT subtitle (language, URL) from an already-extracted yt-dlp info dict"""
+        # Check multiple subtitle sources
+        requested_subs = info.get("requested_subtitles") or {}
+        automatic_subs = info.get("automatic_captions") or {}
+        manual_subs = info.get("subtitles") or {}
+        
+        # Priority: requested > manual > automatic
+        all_subtitles = {}
+        all_subtitles.update(automatic_subs)  # Lowest priority
+        all_subtitles.update(manual_subs)     # Medium priority  
+        all_subtitles.update(requested_subs)  # Highest priority
+        
+        print(f"Available subtitles: {list(all_subtitles.keys())}")  # Debug output
+        
+        def vtt_url(entries) -> Optional[str]:
+            if isinstance(entries, list):
+                for entry in entries:
+                    if isinstance(entry, dict) and entry.get("ext") == "vtt":
+                        return entry.get("url")
+            elif isinstance(entries, dict) and entries.get("ext") == "vtt":
+                return entries.get("url")
+            return None
+        
+        # First, try preferred languages
+        for lang in prefer_langs:
+            if all_subtitles.get(lang):
+                url = vtt_url(all_subtitles[lang])
+                if url:
+                    return lang, url
+        
+        # If no match, try any English variant
+        for lang_key, entries in all_subtitles.items():
+            if lang_key.startswith('en') and entries:
+                url = vtt_url(entries)
+                if url:
+                    return lang_key, url
+        
+        # Last resort: take any available subtitle
+        for lang_key, entries in all_subtitles.items():
+            if entries:
+                url = vtt_url(entries)
+                if url:
+                    return lang_key, url
         
-        with yt_dlp.YoutubeDL(opts) as ydl:
+        return None
+    
+    async def download(self, url: str, headers: Optional[Dict[str, str]] = None,
+                       stream: bool = False) -> httpx.Response:
+        """GET a URL on the shared client, throttled per host and retried on 429.
+        
+        With stream=True the body is not read; the caller must aclose() the response.
+        """
+        host = urlparse(url).hostname or ""
+        
+        async def attempt():
+            await self.throttle.wait(host)
+            client = self.client()
+            response = await client.send(client.build_request("GET", url, headers=headers), stream=stream)
             try:
-                info = ydl.extract_info(f"https://youtube.com/watch?v={video_id}", download=False)
-                
-                # Check multiple subtitle sources
-                requested_subs = info.get("requested_subtitles") or {}
-                automatic_subs = info.get("automatic_captions") or {}
-                manual_subs = info.get("subtitles") or {}
-                
-                # Priority: requested > manual > automatic
-                all_subtitles = {}
-                all_subtitles.update(automatic_subs)  # Lowest priority
-                all_subtitles.update(manual_subs)     # Medium priority  
-                all_subtitles.update(requested_subs)  # Highest priority
-                
-                print(f"Available subtitles: {list(all_subtitles.keys())}")  # Debug output
-                
-                # Find best subtitle match
-                best_subtitle = None
-                best_url = None
-                
-                # First, try preferred languages
-                for lang in prefer_langs:
-                    if lang in all_subtitles and all_subtitles[lang]:
-                        entries = all_subtitles[lang]
-                        if isinstance(entries, list):
-                            for entry in entries:
-                                if isinstance(entry, dict) and entry.get("ext") == "vtt":
-                                    best_subtitle = entry
-                                    best_url = entry.get("url")
-                                    break
-                        elif isinstance(entries, dict) and entries.get("ext") == "vtt":
-                            best_subtitle = entries
-                            best_url = entries.get("url")
-                        if best_subtitle:
-                            break
-                
-                # If no match, try any English variant
-                if not best_subtitle:
-                    for lang_key in all_subtitles:
-                        if lang_key.startswith('en') and all_subtitles[lang_key]:
-                            entries = all_subtitles[lang_key]
-                            if isinstance(entries, list):
-                                for entry in entries:
-                                    if isinstance(entry, dict) and entry.get("ext") == "vtt":
-                                        best_subtitle = entry
-                                        best_url = entry.get("url")
-                                        break
-                            elif isinstance(entries, dict) and entries.get("ext") == "vtt":
-                                best_subtitle = entries
-                                best_url = entries.get("url")
-                            if best_subtitle:
-                                break
-                
-                # Last resort: take any available subtitle
-                if not best_subtitle:
-                    for lang_key, entries in all_subtitles.items():
-                        if entries:
-                            if isinstance(entries, list):
-                                for entry in entries:
-                                    if isinstance(entry, dict) and entry.get("ext") == "vtt":
-                                        best_subtitle = entry
-                                        best_url = entry.get("url")
-                                        break
-                            elif isinstance(entries, dict) and entries.get("ext") == "vtt":
-                                best_subtitle = entries
-                                best_url = entries.get("url")
-                            if best_subtitle:
-                                break
+                if response.status_code == 429:
+                    retry_after = response.headers.get("retry-after", "")
+                    raise RateLimited(f"429 from {host}", float(retry_after) if retry_after.isdigit() else None)
+                if response.status_code != 304:
+                    response.raise_for_status()
+            except Exception:
+                await response.aclose()
+                raise
+            return response
+        
+        return await self.with_retries(attempt, host)
+    
+    async def fetch_vtt_segments(self, video_id: str, lang: str, url: str) -> List[Dict]:
+        """Transcript segments for a video/language.
+        
+        Served from the cached VTT when fresh or revalidated by ETag; otherwise the
+        response body is parsed as it streams in and teed into the cache.
+        """
+        parser = VTTParser()
+        cached = self.cache.get_vtt(video_id, lang) if self.cache else None
+        if cached and cached[1]["fresh"]:
+            print(f"Using cached VTT for {video_id} [{lang}]")  # Debug output
+            return parser.parse(cached[0])
+        
+        headers = {}
+        if cached and cached[1].get("etag"):
+            headers["If-None-Match"] = cached[1]["etag"]
+        
+        print(f"Using subtitle URL: {url}")  # Debug output
+        response = await self.download(url, headers, stream=True)
+        try:
+            if response.status_code == 304 and cached:
+                self.cache.revalidated_vtt(video_id, lang)
+                return parser.parse(cached[0])
+            
+            sink = self.cache.open_vtt(video_id, lang) if self.cache else None
+            segments: List[Dict] = []
+            try:
+                async for chunk in response.aiter_text():
+                    segments.extend(parser.feed(chunk))
+                    if sink:
+                        sink.write(chunk)
+                segments.extend(parser.close())
+            except Exception:
+                if sink:
+                    self.cache.discard_vtt(sink)
+                raise
+            if sink:
+                self.cache.commit_vtt(video_id, lang, sink, response.headers.get("etag"))
+            return segments
+        finally:
+            await response.aclose()
+    
+    async def fetch_transcript_segments(self, info: Dict, prefer_langs: List[str]) -> List[Dict]:
+        """Fetch transcript segments for an already-extracted video, falling back to local ASR"""
+        segments = await self.fetch_subtitle_segments(info, prefer_langs)
+        if not segments and self.config.asr_enabled:
+            try:
+                segments = await self.transcribe_audio(info, prefer_langs)
+            except Exception as e:
+                print(f"⚠ Local ASR failed: {e}")
+        return segments
+    
+    def asr_available(self) -> bool:
+        if importlib.util.find_spec("faster_whisper") is None:
+            print("⚠ ASR fallback enabled but faster-whisper is not installed")
+            return False
+        if not shutil.which("ffmpeg"):
+            print("⚠ ASR fallback enabled but ffmpeg is not on PATH")
+            return False
+        return True
+    
+    def _download_audio(self, url: str, work_dir: Path) -> Path:
+        """Download the audio-only stream (blocking; run in a thread)"""
+        opts = {"quiet": True, "no_warnings": True, "format": "bestaudio/best",
+                "outtmpl": str(work_dir / "audio.%(ext)s")}
+        try:
+            with yt_dlp.YoutubeDL(opts) as ydl:
+                info = ydl.extract_info(url, download=True)
+                return Path(ydl.prepare_filename(info))
+        except yt_dlp.utils.DownloadError as e:
+            if is_rate_limited(e):
+                raise RateLimited(str(e)) from e
+            raise
+    
+    async def transcribe_audio(self, info: Dict, prefer_langs: List[str]) -> List[Dict]:
+        """Transcribe a captionless video locally: bestaudio → 16 kHz chunks → process pool.
+        
+        At most ASR_MAX_JOBS videos are transcribed at once per process, whatever the
+        number of extractors, and each uses up to ASR_WORKERS × ASR_THREADS cores.
+        """
+        if not self.asr_available():
+            return []
+        pool, slots = asr_resources(self.config)
+        url = info.get("webpage_url") or f"https://www.youtube.com/watch?v={info.get('id')}"
+        
+        await asyncio.to_thread(slots.acquire)
+        try:
+            tmp_root = self.config.hot_root if self.config.hot_root.is_dir() else None
+            with tempfile.TemporaryDirectory(prefix="yt-asr-", dir=tmp_root) as tmp:
+                work_dir = Path(tmp)
+                print(f"Transcribing audio locally ({self.config.asr_model}): {url}")
+                host = urlparse(url).hostname or "youtube.com"
                 
-                if not best_url:
-                    print("No subtitle URL found")  # Debug output
-                    return []
+                async def download():
+                    await self.throttle.wait(host)
+                    return await asyncio.to_thread(self._download_audio, url, work_dir)
                 
-                print(f"Using subtitle URL: {best_url}")  # Debug output
+                audio = await self.with_retries(download, url)
                 
-                # Download and parse VTT
-                async with httpx.AsyncClient(timeout=30) as client:
-                    response = await client.get(best_url)
-                    response.raise_for_status()
-                    vtt_content = response.text
-                    print(f"Downloaded VTT content length: {len(vtt_content)}")  # Debug output
-                    return self.parse_vtt_to_segments(vtt_content)
+                chunk_seconds = self.config.asr_chunk_seconds
+                proc = await asyncio.create_subprocess_exec(
+                    "ffmpeg", "-nostdin", "-loglevel", "error", "-i", str(audio),
+                    "-ac", "1", "-ar", "16000", "-c:a", "pcm_s16le",
+                    "-f", "segment", "-segment_time", str(chunk_seconds),
+                    str(work_dir / "chunk%05d.wav"),
+                )
+                if await proc.wait() != 0:
+                    raise RuntimeError(f"ffmpeg exited with {proc.returncode}")
                 
-            except Exception as e:
-                print(f"yt-dlp subtitle extraction failed: {e}")  # Debug output
+                chunks = sorted(work_dir.glob("chunk*.wav"))
+                language = prefer_langs[0].split("-")[0] if prefer_langs else None
+                loop = asyncio.get_running_loop()
+                results = await asyncio.gather(*(
+                    loop.run_in_executor(pool, transcribe_chunk, str(chunk), i * chunk_seconds,
+                                         self.config.asr_model, self.config.asr_threads, language)
+                    for i, chunk in enumerate(chunks)
+                ))
+        finally:
+            slots.release()
+        
+        segments = [segment for chunk_segments in results for segment in chunk_segments]
+        print(f"Transcribed {len(segments)} segments from {len(chunks)} audio chunks")
+        return segments
+    
+    async def fetch_subtitle_segments(self, info: Dict, prefer_langs: List[str]) -> List[Dict]:
+        """Transcript segments from the video's VTT subtitles ([] if there are none)"""
+        # Skip YouTube Transcript API for now, go directly to yt-dlp subtitles
+        # try:
+        #     transcript = YouTubeTranscriptApi.get_transcript(video_id, languages=prefer_langs)
+        #     return [{"start": t["start"], "text": t["text"]} for t in transcript]
+        # except (TranscriptsDisabled, NoTranscriptFound, VideoUnavailable):
+        #     pass
+        
+        try:
+            best = self.select_subtitle(info, prefer_langs)
+            if not best:
+                print("No subtitle URL found")  # Debug output
                 return []
+            lang, best_url = best
+            
+            try:
+                segments = await self.fetch_vtt_segments(info.get("id", ""), lang, best_url)
+            except httpx.HTTPStatusError:
+                if not info.get("_cached"):
+                    raise
+                # Signed subtitle URLs expire; re-extract once for a fresh one
+                print("Cached subtitle URL expired, re-extracting video info")  # Debug output
+                info = await self.get_video_info(info.get("webpage_url") or info["id"], prefer_langs)
+                best = self.select_subtitle(info, prefer_langs)
+                if not best:
+                    return []
+                lang, best_url = best
+                segments = await self.fetch_vtt_segments(info.get("id", ""), lang, best_url)
+            
+            print(f"Parsed {len(segments)} transcript segments")  # Debug output
+            return segments
+            
+        except Exception as e:
+            print(f"yt-dlp subtitle extraction failed: {e}")  # Debug output
+            return []
     
     def meta_from_ydl_info(self, info: Dict) -> Dict:
         """Extract metadata from yt-dlp info"""
@@ -335,14 +1000,20 @@ class TranscriptExtractor:
     
     async def process_video(self, url: str, output_dir: Path, prefer_langs: List[str], mode: str = "standard") -> Path:
         """Process single video to markdown"""
+        markdown_path, _ = await self.process_video_with_meta(url, output_dir, prefer_langs, mode)
+        return markdown_path
+    
+    async def process_video_with_meta(self, url: str, output_dir: Path, prefer_langs: List[str],
+                                      mode: str = "standard") -> Tuple[Path, Dict]:
+        """Process single video to markdown, returning the file and its metadata"""
         print(f"Processing video: {url}")
         
-        # Get video info
-        info = await self.get_video_info(url)
+        # One extraction (or cache hit) feeds metadata, subtitle selection and any playlist overview
+        info = await self.load_video_info(url, prefer_langs)
         meta = self.meta_from_ydl_info(info)
         
         # Get transcript
-        segments = await self.fetch_transcript_segments(meta["id"], prefer_langs)
+        segments = await self.fetch_transcript_segments(info, prefer_langs)
         
         # Generate filename and content
         title_safe = self.sanitize_filename(meta["title"] or meta["id"])
@@ -354,55 +1025,319 @@ class TranscriptExtractor:
         body = self.format_sections(segments, mode=mode)
         content = "\n".join([header, body])
         
-        # Write file
+        # Write file, plus the segment store and search index for tools that want timestamps
         markdown_path.write_text(content, encoding="utf-8")
+        chunks = self.group_segments(segments, mode)
+        self.write_segments(markdown_path, meta["id"], chunks)
+        if self.index:
+            try:
+                self.index.add(markdown_path, meta, [
+                    (chunk_id, chunk[0]["start"], " ".join(seg["text"] for seg in chunk))
+                    for chunk_id, chunk in enumerate(chunks, start=1)
+                ])
+            except Exception as e:
+                print(f"⚠ Could not index {markdown_path.name}: {e}")
         print(f"✓ Saved: {markdown_path}")
         
-        return markdown_path
+        return markdown_path, meta
     
-    async def process_playlist(self, url: str, root_dir: Path, prefer_langs: List[str], mode: str = "standard") -> Tuple[Path, List[Path]]:
-        """Process playlist to markdown files"""
-        print(f"Processing playlist: {url}")
-        
-        # Get playlist info
-        with yt_dlp.YoutubeDL({"quiet": True, "extract_flat": True, "skip_download": True}) as ydl:
-            playlist_info = ydl.extract_info(url, download=False)
+    def load_manifest(self, playlist_dir: Path) -> Dict:
+        """Read a playlist's manifest of processed videos (empty if missing or unreadable)"""
+        try:
+            manifest = json.loads((playlist_dir / MANIFEST_NAME).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {"videos": {}}
+        manifest.setdefault("videos", {})
+        return manifest
+    
+    def save_manifest(self, playlist_dir: Path, manifest: Dict) -> None:
+        """Atomically write a playlist's manifest"""
+        manifest["updated"] = datetime.now().isoformat(timespec="seconds")
+        tmp = playlist_dir / f"{MANIFEST_NAME}.tmp"
+        tmp.write_text(json.dumps(manifest, indent=2, ensure_ascii=False), encoding="utf-8")
+        tmp.replace(playlist_dir / MANIFEST_NAME)
+    
+    @staticmethod
+    def file_sha256(path: Path) -> str:
+        return hashlib.sha256(path.read_bytes()).hexdigest()
+    
+    def is_synced(self, playlist_dir: Path, record: Optional[Dict]) -> bool:
+        """Whether a manifest record's transcript is still on disk as we wrote it"""
+        if not record:
+            return False
+        path = playlist_dir / record.get("file", "")
+        if not path.is_file():
+            return False
+        if self.file_sha256(path) != record.get("sha256"):
+            # Edited locally since we wrote it; keep the edits rather than regenerate
+            print(f"⚠ Keeping locally modified transcript: {path.name}")
+        return True
+    
+    def emit(self, event: Dict) -> None:
+        """Send a progress event to the listener; listener errors never break processing"""
+        if self.progress:
+            try:
+                self.progress(event)
+            except Exception as e:
+                print(f"⚠ Progress listener failed: {e}")
+    
+    async def run_queue(self, items: List[Tuple[str, Path]], prefer_langs: List[str], mode: str = "standard",
+                        on_done=None) -> List[Optional[Tuple[Path, Dict]]]:
+        """Process (video_id, output_dir) items concurrently, at most config.workers at a time.
         
-        playlist_name = playlist_info.get("title", "playlist")
-        playlist_dir = root_dir / self.sanitize_filename(playlist_name)
-        playlist_dir.mkdir(parents=True, exist_ok=True)
+        on_done(video_id, result, error) is called as each item finishes; results keep item order.
+        A "queued" progress event goes out first, then one "video" event per finished item.
+        """
+        semaphore = asyncio.Semaphore(self.config.workers)
+        total = len(items)
+        finished = 0
+        self.emit({"event": "queued", "total": total})
         
-        video_files: List[Path] = []
-        video_metadata: List[Dict] = []
+        async def worker(video_id: str, output_dir: Path) -> Optional[Tuple[Path, Dict]]:
+            nonlocal finished
+            video_url = f"https://www.youtube.com/watch?v={video_id}"
+            result, error = None, None
+            async with semaphore:
+                try:
+                    result = await self.process_video_with_meta(video_url, output_dir, prefer_langs, mode)
+                except Exception as e:
+                    print(f"⚠ Error processing video {video_url}: {e}")
+                    error = str(e)
+            if on_done:
+                on_done(video_id, result, error)
+            finished += 1
+            self.emit({"event": "video", "video_id": video_id, "done": finished, "total": total,
+                       "file": str(result[0]) if result else None,
+                       "title": result[1]["title"] if result else None, "error": error})
+            return result
         
-        # Process each video
-        for entry in playlist_info.get("entries", []):
+        return await asyncio.gather(*(worker(video_id, output_dir) for video_id, output_dir in items))
+    
+    def playlist_entries(self, info: Dict) -> List[Dict]:
+        """Available video entries of a flat playlist/channel listing, de-duplicated"""
+        entries: List[Dict] = []
+        seen = set()
+        for entry in info.get("entries") or []:
             if not entry or entry.get("_type") == "playlist":
                 continue
             if entry.get("availability") in ("private", "unavailable"):
                 print(f"⚠ Skipping unavailable video: {entry.get('title', 'Unknown')}")
                 continue
-            
-            video_url = f"https://www.youtube.com/watch?v={entry.get('id')}"
+            if entry.get("id") and entry["id"] not in seen:
+                seen.add(entry["id"])
+                entries.append(entry)
+        return entries
+    
+    def playlist_context(self, url: str, name: str, root_dir: Path, entries: List[Dict]) -> Dict:
+        """Output directory, ordered video ids and manifest for a playlist or channel"""
+        playlist_dir = root_dir / self.sanitize_filename(name)
+        playlist_dir.mkdir(parents=True, exist_ok=True)
+        manifest = self.load_manifest(playlist_dir)
+        manifest.update({"playlist": name, "url": url})
+        return {"name": name, "dir": playlist_dir, "video_ids": [entry["id"] for entry in entries],
+                "manifest": manifest}
+    
+    async def list_playlist(self, url: str, root_dir: Path) -> Dict:
+        """Flat-extract a playlist and load its manifest; returns the playlist context"""
+        # Get playlist info (flat: one request for the whole listing)
+        playlist_info = await self.extract_info(url, {"quiet": True, "extract_flat": True, "skip_download": True})
+        return self.playlist_context(url, playlist_info.get("title", "playlist"), root_dir,
+                                     self.playlist_entries(playlist_info))
+    
+    async def list_channel(self, url: str, root_dir: Path, prefer_langs: List[str],
+                           last: Optional[int] = None, since: Optional[str] = None) -> Dict:
+        """Flat-list a channel's uploads, newest first, keeping the last N and/or those since a date.
+        
+        Filtering happens on the flat listing so only videos that pass are ever
+        deep-extracted. Listings without dates (approximate_date gives "3 weeks
+        ago" precision when YouTube shows it) fall back to deep-extracting newest
+        first and stopping at the first video older than the window.
+        """
+        videos_url = self.channel_videos_url(url) or url
+        opts = {"quiet": True, "extract_flat": True, "skip_download": True,
+                "extractor_args": {"youtubetab": {"approximate_date": [""]}}}
+        if last:
+            # Only fetch as many listing pages as needed
+            opts["playlistend"] = last
+        channel_info = await self.extract_info(videos_url, opts)
+        entries = self.playlist_entries(channel_info)
+        if last:
+            entries = entries[:last]
+        
+        if since:
+            kept = []
+            for entry in entries:
+                upload_date = self.entry_upload_date(entry)
+                if upload_date is None:
+                    info = await self.load_video_info(f"https://www.youtube.com/watch?v={entry['id']}", prefer_langs)
+                    self.prefetched[entry["id"]] = info
+                    upload_date = self.entry_upload_date(info)
+                    if upload_date and upload_date < since:
+                        # Uploads are newest first: everything after this is older still
+                        self.prefetched.pop(entry["id"], None)
+                        break
+                if not upload_date or upload_date >= since:
+                    kept.append(entry)
+            print(f"Channel window: {len(kept)} of {len(entries)} listed videos since {since}")
+            entries = kept
+        
+        name = (channel_info.get("channel") or channel_info.get("uploader") or
+                channel_info.get("title") or "channel")
+        return self.playlist_context(url, name, root_dir, entries)
+    
+    def pending_videos(self, playlist: Dict, sync: bool) -> List[str]:
+        """Playlist videos that still need processing (all of them unless syncing)"""
+        if not sync:
+            return list(playlist["video_ids"])
+        records = playlist["manifest"]["videos"]
+        pending = [video_id for video_id in playlist["video_ids"]
+                   if not self.is_synced(playlist["dir"], records.get(video_id))]
+        print(f"Sync: {len(playlist['video_ids']) - len(pending)} up to date, {len(pending)} to process")
+        return pending
+    
+    def record_video(self, playlist: Dict, video_id: str, path: Path, meta: Dict) -> None:
+        """Add a finished video to the playlist manifest (saved immediately so killed runs keep it)"""
+        playlist["manifest"]["videos"][video_id] = {
+            "title": meta["title"],
+            "file": path.name,
+            "sha256": self.file_sha256(path),
+            "meta": meta,
+        }
+        self.save_manifest(playlist["dir"], playlist["manifest"])
+    
+    def write_playlist_overview(self, playlist: Dict) -> Path:
+        """Overview from the manifest so skipped videos are listed too, in playlist order"""
+        records = playlist["manifest"]["videos"]
+        video_metadata = [records[video_id]["meta"] for video_id in playlist["video_ids"] if video_id in records]
+        self.save_manifest(playlist["dir"], playlist["manifest"])
+        overview_content = self.format_playlist_overview(playlist["name"], video_metadata)
+        overview_path = playlist["dir"] / "00-playlist-overview.md"
+        overview_path.write_text(overview_content, encoding="utf-8")
+        print(f"✓ Created playlist overview: {overview_path}")
+        return overview_path
+    
+    async def process_playlist(self, url: str, root_dir: Path, prefer_langs: List[str], mode: str = "standard",
+                               sync: bool = False) -> Tuple[Path, List[Path]]:
+        """Process playlist to markdown files.
+        
+        With sync=True, videos already recorded in the playlist manifest are skipped
+        without touching yt-dlp and only new entries are processed.
+        """
+        print(f"Processing playlist: {url}")
+        playlist = await self.list_playlist(url, root_dir)
+        return await self.process_collection(playlist, prefer_langs, mode, sync)
+    
+    async def process_channel(self, url: str, root_dir: Path, prefer_langs: List[str], mode: str = "standard",
+                              sync: bool = False, last: Optional[int] = None,
+                              since: Optional[str] = None) -> Tuple[Path, List[Path]]:
+        """Process a channel's recent uploads (last N and/or since a YYYYMMDD date) to markdown files"""
+        print(f"Processing channel: {url}")
+        playlist = await self.list_channel(url, root_dir, prefer_langs, last, since)
+        return await self.process_collection(playlist, prefer_langs, mode, sync)
+    
+    async def process_collection(self, playlist: Dict, prefer_langs: List[str], mode: str = "standard",
+                                 sync: bool = False) -> Tuple[Path, List[Path]]:
+        """Process the videos of a listed playlist/channel and write its overview"""
+        pending = self.pending_videos(playlist, sync)
+        
+        def on_done(video_id: str, result: Optional[Tuple[Path, Dict]], error: Optional[str]) -> None:
+            if result:
+                self.record_video(playlist, video_id, *result)
+        
+        results = await self.run_queue([(video_id, playlist["dir"]) for video_id in pending],
+                                       prefer_langs, mode, on_done)
+        self.write_playlist_overview(playlist)
+        
+        return playlist["dir"], [result[0] for result in results if result]
+    
+    async def process_batch(self, urls: List[str], root_dir: Path, prefer_langs: List[str],
+                            mode: str = "standard", sync: bool = False,
+                            state_path: Optional[Path] = None, last: Optional[int] = None,
+                            since: Optional[str] = None) -> Dict[str, int]:
+        """Process many video/playlist URLs as one de-duplicated work queue.
+        
+        Progress goes to a state file after every video, so re-running the same batch
+        after a crash skips what already finished. The state file is removed once a
+        batch completes without failures.
+        """
+        unique_urls = list(dict.fromkeys(urls))
+        if state_path is None:
+            digest = hashlib.sha1("\n".join(sorted(unique_urls)).encode()).hexdigest()[:12]
+            state_path = root_dir / ".batches" / f"{digest}.json"
+        state = BatchState(state_path)
+        if state.done:
+            print(f"Resuming batch: {len(state.done)} videos already done ({state_path})")
+        
+        date_dir = root_dir / "individual" / datetime.now().strftime("%Y-%m-%d")
+        queue: Dict[str, Path] = {}
+        owners: Dict[str, Dict] = {}
+        playlists: List[Dict] = []
+        skipped = 0
+        
+        def enqueue(video_id: str, output_dir: Path, playlist: Optional[Dict] = None) -> None:
+            nonlocal skipped
+            if not video_id or video_id in state.done or video_id in queue:
+                skipped += 1
+                # A video also listed in a playlist belongs in that playlist's directory
+                if playlist and video_id in queue and video_id not in owners:
+                    queue[video_id] = output_dir
+                    owners[video_id] = playlist
+                return
+            queue[video_id] = output_dir
+            if playlist:
+                owners[video_id] = playlist
+        
+        for url in unique_urls:
+            if not self.is_youtube_url(url):
+                print(f"⚠ Skipping invalid YouTube URL: {url}")
+                continue
+            video_id = self.extract_video_id(url)
+            if "playlist" not in url and video_id:
+                enqueue(video_id, date_dir)
+                continue
             try:
-                video_file = await self.process_video(video_url, playlist_dir, prefer_langs, mode)
-                video_files.append(video_file)
-                
-                # Get metadata for overview
-                video_info = await self.get_video_info(video_url)
-                video_metadata.append(self.meta_from_ydl_info(video_info))
-                
+                print(f"Listing: {url}")
+                if self.channel_videos_url(url):
+                    playlist = await self.list_channel(url, root_dir / "channels", prefer_langs, last, since)
+                else:
+                    playlist = await self.list_playlist(url, root_dir / "playlists")
             except Exception as e:
-                print(f"⚠ Error processing video {video_url}: {e}")
+                print(f"⚠ Error listing {url}: {e}")
+                state.unlisted[url] = str(e)
                 continue
+            playlists.append(playlist)
+            for playlist_video in self.pending_videos(playlist, sync):
+                enqueue(playlist_video, playlist["dir"], playlist)
         
-        # Create playlist overview
-        overview_content = self.format_playlist_overview(playlist_name, video_metadata)
-        overview_path = playlist_dir / "00-playlist-overview.md"
-        overview_path.write_text(overview_content, encoding="utf-8")
-        print(f"✓ Created playlist overview: {overview_path}")
+        print(f"Batch: {len(queue)} videos queued, {skipped} duplicates or already done")
+        
+        def on_done(video_id: str, result: Optional[Tuple[Path, Dict]], error: Optional[str]) -> None:
+            if result:
+                if video_id in owners:
+                    self.record_video(owners[video_id], video_id, *result)
+                state.mark_done(video_id, result[0])
+            else:
+                state.mark_failed(video_id, error or "no result")
+        
+        await self.run_queue(list(queue.items()), prefer_langs, mode, on_done)
+        for playlist in playlists:
+            self.write_playlist_overview(playlist)
         
-        return playlist_dir, video_files
+        summary = {"processed": len(queue) - len(state.failed), "failed": len(state.failed),
+                   "skipped": skipped, "unlisted": len(state.unlisted)}
+        if not state.failed and not state.unlisted:
+            state.remove()
+        return summary
+
+
+def read_url_list(source: str) -> List[str]:
+    """URLs from a file (or '-' for stdin), one per line; blank lines and # comments ignored"""
+    stream = sys.stdin if source == "-" else open(source, encoding="utf-8")
+    try:
+        return [line.strip() for line in stream if line.strip() and not line.lstrip().startswith("#")]
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
 
 
 async def main():
@@ -416,26 +1351,69 @@ Examples:
   yt-transcript "https://youtube.com/watch?v=dQw4w9WgXcQ"
   yt-transcript "https://youtube.com/playlist?list=PLZHQObOWTQDPD3MizzM2xVFitgF8hE_ab"
   yt-transcript --output-dir /custom/path --format detailed "URL"
+  yt-transcript --sync "https://youtube.com/playlist?list=..."   # nightly: new videos only
+  yt-transcript --input urls.txt                                 # batch, resumable
+  yt-transcript --last 20 "https://youtube.com/@channel"
+  yt-transcript --since 30d --sync "https://youtube.com/@channel"
+  cat urls.txt | yt-transcript --input - "URL"
         """
     )
     
-    parser.add_argument("url", help="YouTube video or playlist URL")
+    parser.add_argument("urls", nargs="*", metavar="url", help="YouTube video or playlist URL(s)")
+    parser.add_argument("--input", "-i", default=None,
+                       help="File with one URL per line ('-' for stdin); processed as one batch")
+    parser.add_argument("--state", default=None,
+                       help="Batch state file for resuming (default: <output>/.batches/<hash>.json)")
     parser.add_argument("--output-dir", default=None, help="Custom output directory")
     parser.add_argument("--format", choices=["standard", "detailed"], default="standard",
                        help="Sectioning density (standard=20s gaps, detailed=12s gaps)")
     parser.add_argument("--langs", default=None,
                        help="Comma-separated list of preferred languages (e.g., 'en,en-US,fr')")
+    parser.add_argument("--workers", type=int, default=None,
+                       help="Videos processed concurrently (default: $YT_WORKERS or 4)")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the metadata/subtitle cache")
+    parser.add_argument("--segments", choices=["jsonl", "parquet", "none"], default=None,
+                       help="Segment store written next to each transcript (default: $YT_SEGMENTS_FORMAT or jsonl)")
+    parser.add_argument("--last", type=int, default=None, help="Channels: only the N most recent uploads")
+    parser.add_argument("--since", default=None,
+                       help="Channels: only uploads since a date (YYYY-MM-DD, YYYYMMDD or e.g. 30d)")
+    parser.add_argument("--asr", action="store_true",
+                       help="Transcribe captionless videos locally with faster-whisper (or ASR_FALLBACK=1)")
+    parser.add_argument("--sync", action="store_true",
+                       help="Playlists: only process videos missing from the playlist manifest")
     parser.add_argument("--verbose", "-v", action="store_true", help="Verbose output")
     
     args = parser.parse_args()
     
     # Initialize config and extractor
     config = Config()
+    if args.workers:
+        config.workers = max(1, args.workers)
+    if args.no_cache:
+        config.cache_enabled = False
+    if args.segments:
+        config.segments_format = args.segments
+    if args.asr:
+        config.asr_enabled = True
+    since = None
+    if args.since:
+        try:
+            since = TranscriptExtractor.parse_since(args.since)
+        except ValueError:
+            parser.error(f"invalid --since date: {args.since}")
+    
+    urls = list(args.urls)
+    if args.input:
+        urls += read_url_list(args.input)
+    if not urls:
+        parser.error("no URLs given (pass them as arguments or with --input)")
+    batch = len(urls) > 1 or args.input is not None
+    
     extractor = TranscriptExtractor(config)
     
     # Validate URL
-    if not extractor.is_youtube_url(args.url):
-        print(f"❌ Invalid YouTube URL: {args.url}")
+    if not batch and not extractor.is_youtube_url(urls[0]):
+        print(f"❌ Invalid YouTube URL: {urls[0]}")
         sys.exit(1)
     
     # Set up output directory
@@ -452,15 +1430,32 @@ Examples:
     
     # Process URL
     try:
-        if "playlist" in args.url:
+        if batch:
+            summary = await extractor.process_batch(
+                urls, output_root, prefer_langs, args.format, sync=args.sync,
+                state_path=Path(args.state) if args.state else None, last=args.last, since=since
+            )
+            print(f"✅ Batch processed: {summary['processed']} videos, "
+                  f"{summary['failed']} failed, {summary['skipped']} skipped")
+            if summary["unlisted"]:
+                print(f"❌ {summary['unlisted']} playlists/channels could not be listed")
+            if summary["failed"] or summary["unlisted"]:
+                sys.exit(1)
+        elif extractor.channel_videos_url(urls[0]):
+            channel_dir, files = await extractor.process_channel(
+                urls[0], output_root / "channels", prefer_langs, args.format,
+                sync=args.sync, last=args.last, since=since
+            )
+            print(f"✅ Channel processed: {len(files)} videos in {channel_dir}")
+        elif "playlist" in urls[0]:
             playlist_dir, files = await extractor.process_playlist(
-                args.url, output_root / "playlists", prefer_langs, args.format
+                urls[0], output_root / "playlists", prefer_langs, args.format, sync=args.sync
             )
             print(f"✅ Playlist processed: {len(files)} videos in {playlist_dir}")
         else:
             # Single video
             date_dir = output_root / "individual" / datetime.now().strftime("%Y-%m-%d")
-            file_path = await extractor.process_video(args.url, date_dir, prefer_langs, args.format)
+            file_path = await extractor.process_video(urls[0], date_dir, prefer_langs, args.format)
             print(f"✅ Video processed: {file_path}")
     
     except KeyboardInterrupt:
@@ -472,6 +1467,8 @@ Examples:
             import traceback
             traceback.print_exc()
         sys.exit(1)
+    finally:
+        await extractor.aclose()
 
 
 if __name__ == "__main__":
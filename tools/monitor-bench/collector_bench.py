@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Collector Benchmark Harness - Time the media-monitor and business-metrics collectors
+Builds synthetic /media + /hot trees and runs every filesystem collector in
+isolation (one fresh subprocess each), reporting wall time, syscalls and peak RSS.
+
+Usage:
+    ./collector_bench.py --sizes 10000,100000 --save-baseline baseline.json
+    # After changing a collector
+    ./collector_bench.py --sizes 10000,100000 --baseline baseline.json
+    # Exits 1 if any collector got slower/heavier than the baseline allows
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import random
+import re
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+MEDIA_MONITOR = REPO_ROOT / "hosts/server/modules/media-monitor.py"
+BUSINESS_MONITORING = REPO_ROOT / "hosts/server/modules/business-monitoring.nix"
+
+# Collector name -> (module, setup steps run before timing, timed call)
+COLLECTORS = {
+    "media.storage_usage": ("media", [], "check_storage_usage"),
+    "media.download_queues": ("media", [], "count_download_queues"),
+    "media.index_reconcile": ("media", [], "media_index.reconcile"),
+    "media.media_imports": ("media", ["media_index.reconcile"], "analyze_media_imports"),
+    "business.library_scan": ("business", [], "refresh_scan"),
+    "business.library_metrics": ("business", [], "calculate_library_metrics"),
+    "business.storage_efficiency": ("business", [], "calculate_storage_efficiency"),
+    "business.costs": ("business", [], "estimate_costs"),
+    "business.processing_efficiency": ("business", [], "analyze_processing_efficiency"),
+    "business.cycle": ("business", [], "run_monitoring_cycle"),
+}
+
+# Where synthetic files go, weighted roughly like the real server
+TREE_LAYOUT = [
+    ("media/movies", 0.25), ("media/tv", 0.35), ("media/music", 0.25),
+    ("hot/downloads/torrents", 0.03), ("hot/downloads/usenet", 0.02),
+    ("hot/downloads/movies", 0.01), ("hot/downloads/tv", 0.01), ("hot/downloads/music", 0.01),
+    ("hot/processing/movies", 0.005), ("hot/processing/tv", 0.005), ("hot/processing/music", 0.005),
+    ("hot/manual/music", 0.005), ("hot/quarantine/tv", 0.005), ("hot/cache", 0.02),
+]
+
+
+class TreeBuilder:
+    """Deterministic synthetic media tree generator"""
+
+    def __init__(self, root: Path, files: int, depth: int, fanout: int, seed: int = 42):
+        self.root = root
+        self.files = files
+        self.depth = depth
+        self.fanout = fanout
+        self.rng = random.Random(seed)
+
+    def _leaf_dir(self, base: Path, index: int) -> Path:
+        # Spread files over a fanout^depth directory grid, varying depth per file
+        depth = 1 + index % self.depth
+        parts = []
+        n = index // self.depth
+        for _ in range(depth):
+            parts.append(f"d{n % self.fanout:03d}")
+            n //= self.fanout
+        return base.joinpath(*parts)
+
+    def build(self) -> Path:
+        """Create the tree (sparse files, randomised sizes and mtimes) if missing"""
+        marker = self.root / ".complete"
+        if marker.exists():
+            return self.root
+
+        shutil.rmtree(self.root, ignore_errors=True)
+        now = time.time()
+        created = 0
+        for rel, share in TREE_LAYOUT:
+            base = self.root / rel
+            count = max(1, int(self.files * share))
+            made_dirs = set()
+            for i in range(count):
+                leaf = self._leaf_dir(base, i)
+                if leaf not in made_dirs:
+                    leaf.mkdir(parents=True, exist_ok=True)
+                    made_dirs.add(leaf)
+                path = leaf / f"f{i:08d}.mkv"
+                with open(path, "wb") as f:
+                    # Sparse: reported size without using the disk
+                    f.truncate(self.rng.randint(1 << 20, 1 << 32))
+                # ~2% modified within the last hour, the rest spread over a year
+                age = self.rng.uniform(0, 3600) if self.rng.random() < 0.02 else self.rng.uniform(3600, 365 * 86400)
+                os.utime(path, (now - age, now - age))
+                created += 1
+            print(f"  {rel}: {count} files", file=sys.stderr)
+
+        marker.write_text(str(created))
+        return self.root
+
+
+def load_media_monitor():
+    """Import media-monitor.py (hyphenated filename) as a module"""
+    spec = importlib.util.spec_from_file_location("media_monitor", MEDIA_MONITOR)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def load_business_metrics():
+    """Extract business_metrics.py from the Nix heredoc and import it"""
+    text = BUSINESS_MONITORING.read_text()
+    match = re.search(r"cat > /opt/monitoring/business/business_metrics\.py << 'EOF'\n(.*?)\nEOF\n", text, re.S)
+    if not match:
+        raise RuntimeError(f"business_metrics.py heredoc not found in {BUSINESS_MONITORING}")
+    module = type(sys)("business_metrics")
+    exec(compile(match.group(1), "business_metrics.py", "exec"), module.__dict__)
+    return module
+
+
+def resolve(obj, dotted: str):
+    for part in dotted.split("."):
+        obj = getattr(obj, part)
+    return obj
+
+
+def run_child(collector: str, tree: Path, state_dir: Path) -> Dict:
+    """Run one collector in this process and return its measurements"""
+    os.environ["MONITOR_MEDIA_ROOT"] = str(tree / "media")
+    os.environ["MONITOR_HOT_ROOT"] = str(tree / "hot")
+    os.environ["MEDIA_INDEX_DB"] = str(state_dir / "media_index.db")
+    os.environ["MONITOR_NODES_FILE"] = str(state_dir / "no-nodes.json")
+
+    module_name, setup, call = COLLECTORS[collector]
+    if module_name == "media":
+        monitor = load_media_monitor().MediaMonitor()
+    else:
+        monitor = load_business_metrics().BusinessMonitor()
+
+    for step in setup:
+        resolve(monitor, step)()
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    io_before = read_proc_io()
+    start = time.perf_counter()
+    resolve(monitor, call)()
+    wall = time.perf_counter() - start
+    io_after = read_proc_io()
+
+    return {
+        "wall_seconds": wall,
+        "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "rss_growth_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before,
+        "io_syscalls": (io_after["syscr"] + io_after["syscw"]) - (io_before["syscr"] + io_before["syscw"])
+        if io_before and io_after else None,
+    }
+
+
+def read_proc_io() -> Optional[Dict[str, int]]:
+    try:
+        with open("/proc/self/io") as f:
+            return {k: int(v) for k, v in (line.split(": ") for line in f)}
+    except OSError:
+        return None
+
+
+def count_syscalls(strace_out: Path) -> Optional[int]:
+    """Sum the calls column of an `strace -c` summary"""
+    try:
+        lines = strace_out.read_text().splitlines()
+    except OSError:
+        return None
+    total = 0
+    for line in lines:
+        fields = line.split()
+        # Rows are: % time, seconds, usecs/call, calls, [errors], syscall
+        if len(fields) < 5 or fields[-1] == "total" or not fields[3].isdigit():
+            continue
+        total += int(fields[3])
+    return total
+
+
+def run_isolated(collector: str, tree: Path, use_strace: bool) -> Dict:
+    """Run a collector in a fresh interpreter so caches and RSS don't leak between runs"""
+    with tempfile.TemporaryDirectory(prefix="collector-bench-") as state:
+        cmd = [sys.executable, __file__, "_child", collector, str(tree), state]
+        strace_out = Path(state) / "strace.txt"
+        if use_strace:
+            cmd = ["strace", "-f", "-c", "-o", str(strace_out)] + cmd
+
+        proc = subprocess.run(cmd, capture_output=True, text=True)
+        if proc.returncode != 0:
+            raise RuntimeError(f"{collector} failed:\n{proc.stderr}")
+
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        # strace counts the whole process (imports included); still comparable run to run
+        result["syscalls"] = count_syscalls(strace_out) if use_strace else None
+        return result
+
+
+def check_regressions(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Return a message for every metric that exceeds baseline * (1 + tolerance)"""
+    failures = []
+    for key, metrics in results.items():
+        base = baseline.get(key)
+        if not base:
+            continue
+        for metric in ("wall_seconds", "peak_rss_kb", "syscalls"):
+            new, old = metrics.get(metric), base.get(metric)
+            if new is None or not old:
+                continue
+            # Ignore sub-10ms timings, they are noise
+            if metric == "wall_seconds" and new < 0.01:
+                continue
+            if new > old * (1 + tolerance):
+                failures.append(f"{key} {metric}: {old:g} -> {new:g} (+{(new / old - 1) * 100:.0f}%)")
+    return failures
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "_child":
+        _, _, collector, tree, state = sys.argv
+        print(json.dumps(run_child(collector, Path(tree), Path(state))))
+        return
+
+    parser = argparse.ArgumentParser(description="Benchmark media/business monitor collectors")
+    parser.add_argument("--sizes", default="10000,100000",
+                        help="Comma-separated synthetic tree sizes in files (e.g. 10000,1000000,5000000)")
+    parser.add_argument("--depth", type=int, default=4, help="Maximum directory depth below each root")
+    parser.add_argument("--fanout", type=int, default=20, help="Subdirectories per level")
+    parser.add_argument("--work-dir", default=os.path.join(tempfile.gettempdir(), "collector-bench"),
+                        help="Where synthetic trees are built and cached between runs")
+    parser.add_argument("--collectors", default=",".join(COLLECTORS),
+                        help="Comma-separated collectors to run")
+    parser.add_argument("--strace", action="store_true", help="Count all syscalls with strace -c")
+    parser.add_argument("--baseline", help="Fail if results regress against this JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed regression ratio (default 0.25)")
+    parser.add_argument("--save-baseline", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    if args.strace and not shutil.which("strace"):
+        parser.error("--strace requested but strace is not installed")
+
+    collectors = [c.strip() for c in args.collectors.split(",") if c.strip()]
+    unknown = [c for c in collectors if c not in COLLECTORS]
+    if unknown:
+        parser.error(f"unknown collectors: {', '.join(unknown)}")
+
+    results = {}
+    for size in (int(s) for s in args.sizes.split(",")):
+        tree = Path(args.work_dir) / f"tree-{size}-d{args.depth}-f{args.fanout}"
+        print(f"Building {size}-file tree in {tree}...", file=sys.stderr)
+        TreeBuilder(tree, size, args.depth, args.fanout).build()
+
+        for collector in collectors:
+            result = run_isolated(collector, tree, args.strace)
+            results[f"{collector}@{size}"] = result
+            print(f"{collector:34s} {size:>9d} files  {result['wall_seconds']:8.3f}s  "
+                  f"rss {result['peak_rss_kb'] / 1024:7.1f} MB  "
+                  f"syscalls {result['syscalls'] if result['syscalls'] is not None else '-':>9}  "
+                  f"io {result['io_syscalls'] if result['io_syscalls'] is not None else '-'}")
+
+    if args.save_baseline:
+        Path(args.save_baseline).write_text(json.dumps(results, indent=2, sort_keys=True))
+        print(f"Baseline written to {args.save_baseline}", file=sys.stderr)
+
+    if args.baseline:
+        failures = check_regressions(results, json.loads(Path(args.baseline).read_text()), args.tolerance)
+        if failures:
+            print("\nRegressions:", file=sys.stderr)
+            for failure in failures:
+                print(f"  {failure}", file=sys.stderr)
+            sys.exit(1)
+        print("No regressions against baseline", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()